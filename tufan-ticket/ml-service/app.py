@@ -1,24 +1,134 @@
 # ml-service/app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import numpy as np
 import pandas as pd
+import copy
+import io
+import os
+import json
+import time
 from datetime import datetime
 
 # Import models from our modules
+from models.recommendation.collaborative_filtering import CollaborativeFilteringModel
+from models.recommendation.content_based import ContentBasedRecommender
 from models.recommendation.hybrid import HybridRecommender
 from models.trends.forecasting import TrendForecaster
+from models.trends.streaming import StreamingTrendEngine
 from models.sentiment.analyzer import SentimentAnalyzer
+from models.sentiment.batching import MicroBatcher
 from models.anomaly.detector import AnomalyDetector
+from models.anomaly.streaming import StreamingAnomalyDetector
+from models.data.artifacts import has_artifact
+from models.data.columnar import load_frame, save_frame
+from models.data.interaction_log import InteractionLog
+from models.cache import ResultCache, Uncached, normalize_text
+from models.metrics import metrics
+from models.profiler import SamplingProfiler
+from models.registry import ModelRegistry
+from serialization import add_display_columns, events_to_records, json_response
 
 app = Flask(__name__)
 CORS(app)
 
+# Opt-in: with PROFILE_DIR set, requests slower than PROFILE_SLOW_MS leave a
+# collapsed-stack profile (flame-graph input) in that directory
+profiler = None
+if os.environ.get('PROFILE_DIR'):
+    profiler = SamplingProfiler(
+        os.environ['PROFILE_DIR'],
+        slow_ms=float(os.environ.get('PROFILE_SLOW_MS', 500)),
+        interval_ms=float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    )
+
+def observe_request(route, method, status, seconds):
+    metrics.observe('ml_request_seconds', seconds, route=route, method=method, status=str(status))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if profiler is not None:
+        g.profile = profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route pattern rather than path, so IDs don't multiply series
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    observe_request(route, request.method, response.status_code, time.perf_counter() - g.request_start)
+    if profiler is not None:
+        profiler.stop(g.pop('profile'), f'{request.method} {route}')
+    return response
+
+# Warm start: with MODEL_DIR set, workers memory-map fitted models from disk
+# (sharing pages through the OS page cache) instead of refitting them
+MODEL_DIR = os.environ.get('MODEL_DIR')
+
 # Initialize models
-hybrid_model = HybridRecommender()
+hybrid_model = HybridRecommender(CollaborativeFilteringModel(), ContentBasedRecommender())
 trend_model = TrendForecaster()
-sentiment_model = SentimentAnalyzer()
+# SENTIMENT_CASCADE=1 scores with VADER first and escalates only ambiguous
+# (|compound| < SENTIMENT_UNCERTAINTY_BAND) or long texts to the transformer,
+# which runs on SENTIMENT_BACKEND (pytorch, quantized or onnx). With MODEL_DIR
+# set, the onnx export is saved there once instead of redone by every worker
+sentiment_model = SentimentAnalyzer(
+    aspect_lexicon=os.environ.get('ASPECT_LEXICON_PATH'),
+    backend=os.environ.get('SENTIMENT_BACKEND', 'pytorch'),
+    onnx_path=os.path.join(MODEL_DIR, 'sentiment-onnx') if MODEL_DIR else None,
+    cascade=os.environ.get('SENTIMENT_CASCADE') == '1',
+    uncertainty_band=float(os.environ.get('SENTIMENT_UNCERTAINTY_BAND', 0.5)),
+    escalate_length=int(os.environ.get('SENTIMENT_ESCALATE_LENGTH', 512))
+)
 anomaly_model = AnomalyDetector()
+streaming_anomaly_model = StreamingAnomalyDetector()
+
+# Models are loaded on first use, or ahead of it by the warmup below
+registry = ModelRegistry()
+
+# Cache sentiment and anomaly results by input and model version. RESULT_CACHE
+# is 'memory' (per worker), 'sqlite' (a file at RESULT_CACHE_PATH shared by
+# the workers on a host; put it under /dev/shm to keep it in memory) or 'none'
+RESULT_CACHE = os.environ.get('RESULT_CACHE', 'memory')
+result_cache = None
+if RESULT_CACHE != 'none':
+    result_cache = ResultCache(
+        backend=RESULT_CACHE,
+        path=os.environ.get('RESULT_CACHE_PATH'),
+        max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 10000)),
+        ttl_seconds=float(os.environ.get('RESULT_CACHE_TTL', 3600))
+    )
+
+def score_sentiments(texts):
+    """Sentiment for each text, reusing cached results for texts seen before"""
+    model = registry.get('sentiment')
+    if result_cache is None:
+        return model.analyze_batch(texts)
+
+    def compute(batch):
+        # VADER standing in for a failed transformer pass isn't this model
+        # version's answer, so it is served once but never cached
+        results, tiers = model.analyze_batch(batch, return_tiers=True)
+        return [Uncached(result) if tier == 'fallback' else result for result, tier in zip(results, tiers)]
+
+    return result_cache.get_or_compute('sentiment', model.version, texts, compute, normalize=normalize_text)
+
+def score_anomalies(metrics):
+    """
+    Anomalies for a metrics dict or a list of them. Z-scores are relative to
+    the whole payload, so the payload as a whole is the cache key.
+    """
+    model = registry.get('anomaly')
+    detect = model.detect_batch if isinstance(metrics, list) else model.detect
+    if result_cache is None:
+        return detect(metrics)
+    return result_cache.get_or_compute_one('anomaly', model.version, metrics, detect)
+
+# Coalesce concurrent single-text sentiment requests into one forward pass
+sentiment_batcher = MicroBatcher(
+    score_sentiments,
+    max_batch_size=int(os.environ.get('SENTIMENT_MAX_BATCH', 32)),
+    max_wait_ms=float(os.environ.get('SENTIMENT_BATCH_WAIT_MS', 10))
+)
 
 # Load sample data for demo
 def load_sample_data():
@@ -35,25 +145,146 @@ def load_sample_data():
         'title': [f'Event Title {i}' for i in range(1, 501)],
         'category': np.random.choice(['Music', 'Sports', 'Arts', 'Food', 'Tech'], 500),
         'location': np.random.choice(['New York', 'Los Angeles', 'Chicago'], 500),
-        'price': np.random.randint(20, 200, 500)
+        'price': np.random.randint(20, 200, 500).astype(np.float32)
     })
 
     interactions = pd.DataFrame({
         'user_id': np.random.choice(users['user_id'], 10000),
         'event_id': np.random.choice(events['event_id'], 10000),
         'interaction_type': np.random.choice(['view', 'click', 'purchase'], 10000),
-        'timestamp': [datetime.now() - pd.Timedelta(days=np.random.randint(1, 30))
-                     for _ in range(10000)]
+        'timestamp': datetime.now() - pd.to_timedelta(np.random.randint(1, 30, 10000), unit='D')
     })
 
     return users, events, interactions
 
-users_df, events_df, interactions_df = load_sample_data()
+def load_data(data_dir):
+    """
+    Load the columnar frames in data_dir, writing them from the sample data
+    if missing. Every worker maps the same files, so categorical codes,
+    timestamps and prices are shared through the page cache rather than
+    copied into each process.
+    """
+    paths = [os.path.join(data_dir, name) for name in ('users', 'events', 'interactions')]
+    if not all(has_artifact(path) for path in paths):
+        for path, frame in zip(paths, load_sample_data()):
+            save_frame(path, frame)
+
+    return tuple(load_frame(path) for path in paths)
+
+DATA_DIR = os.environ.get('DATA_DIR')
+if DATA_DIR:
+    users_df, events_df, interactions_df = load_data(DATA_DIR)
+else:
+    users_df, events_df, interactions_df = load_sample_data()
+
+# Serve interactions from a time-partitioned columnar log. An empty log is
+# seeded from INTERACTION_PARQUET_PATH (or the sample data), and with
+# INTERACTION_WINDOW_DAYS only the partitions in the recent window are read
+INTERACTION_LOG_PATH = os.environ.get('INTERACTION_LOG_PATH')
+if INTERACTION_LOG_PATH:
+    interaction_log = InteractionLog(INTERACTION_LOG_PATH)
+    if interaction_log.empty():
+        if os.environ.get('INTERACTION_PARQUET_PATH'):
+            interaction_log.append_parquet(os.environ['INTERACTION_PARQUET_PATH'])
+        else:
+            interaction_log.append(interactions_df)
+
+    window_days = os.environ.get('INTERACTION_WINDOW_DAYS')
+    window_start = datetime.now() - pd.Timedelta(days=int(window_days)) if window_days else None
+    interactions_df = interaction_log.read(start=window_start)
+
+# Precompute display fields (image URL, tag, date offset) once per catalog load
+events_df = add_display_columns(events_df)
+
+# Maintain trend scores incrementally so trending requests are a heap lookup
+trend_engine = StreamingTrendEngine()
+trend_engine.register_events(events_df)
+trend_engine.ingest_frame(interactions_df)
+events_by_id = events_df.set_index('event_id', drop=False)
+
+# With MATERIALIZED_RECS_PATH set, top-K recommendations are precomputed there
+MATERIALIZED_RECS_PATH = os.environ.get('MATERIALIZED_RECS_PATH')
+
+def load_recommenders():
+    """Load or fit both recommenders, then materialize top-K recommendations if enabled"""
+    if MODEL_DIR:
+        collaborative_path = os.path.join(MODEL_DIR, 'collaborative')
+        if has_artifact(collaborative_path):
+            hybrid_model.collaborative_model = CollaborativeFilteringModel.load(collaborative_path)
+        else:
+            hybrid_model.collaborative_model.fit(interactions_df).save(collaborative_path)
+
+        content_path = os.path.join(MODEL_DIR, 'content')
+        if has_artifact(content_path):
+            hybrid_model.content_model = ContentBasedRecommender.load(content_path)
+        else:
+            hybrid_model.content_model.fit(events_df).save(content_path)
+    else:
+        hybrid_model.collaborative_model.fit(interactions_df)
+        hybrid_model.content_model.fit(events_df)
+
+    # Optionally precompute top-K recommendations for every active user so the
+    # personalized route can serve them without touching the models
+    if os.environ.get('MATERIALIZE_RECOMMENDATIONS') == '1':
+        hybrid_model.materialize(
+            interactions_df,
+            events_df,
+            top_k=int(os.environ.get('MATERIALIZED_TOP_K', 20)),
+            path=MATERIALIZED_RECS_PATH
+        )
+
+    return hybrid_model
+
+def load_trend_model():
+    global trend_model
+
+    if MODEL_DIR:
+        trends_path = os.path.join(MODEL_DIR, 'trends')
+        if has_artifact(trends_path):
+            trend_model = TrendForecaster.load(trends_path)
+        else:
+            trend_model.save(trends_path)
+
+    return trend_model
+
+def load_anomaly_model():
+    global anomaly_model
+
+    if MODEL_DIR:
+        anomaly_path = os.path.join(MODEL_DIR, 'anomaly')
+        if has_artifact(anomaly_path):
+            anomaly_model = AnomalyDetector.load(anomaly_path)
+        else:
+            anomaly_model.save(anomaly_path)
+
+    return anomaly_model
+
+registry.register('recommendations', load_recommenders)
+registry.register('trends', load_trend_model)
+registry.register('anomaly', load_anomaly_model)
+registry.register('sentiment', sentiment_model.load)
+
+# Load models in a background thread so the first request doesn't pay for
+# them. WARMUP_MODELS picks which (comma-separated), or 'none' to load each
+# model only when an endpoint first needs it
+WARMUP_MODELS = os.environ.get('WARMUP_MODELS', 'all')
+if WARMUP_MODELS != 'none':
+    registry.warmup(None if WARMUP_MODELS == 'all' else WARMUP_MODELS.split(','))
 
 # API routes
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage timers, counters and request histograms in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'ready': registry.ready(),
+        'models': registry.status()
+    })
 
 @app.route('/api/recommendations/personalized', methods=['GET'])
 def get_personalized_recommendations():
@@ -64,30 +295,58 @@ def get_personalized_recommendations():
         return jsonify({'error': 'User ID is required'}), 400
 
     try:
-        recommendations = hybrid_model.get_recommendations(
-            user_id,
+        recommender = registry.get('recommendations')
+        recommendations = recommender.get_materialized_recommendations(user_id, events_df, limit=limit)
+        if recommendations is None:
+            recommendations = recommender.get_recommendations(
+                user_id,
+                interactions_df,
+                events_df,
+                limit=limit
+            )
+
+        # Convert to frontend-friendly format
+        return json_response({
+            'success': True,
+            'events': events_to_records(recommendations)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommendations/materialized/refresh', methods=['POST'])
+def refresh_materialized_recommendations():
+    try:
+        recommender = registry.get('recommendations')
+        refreshed_users = recommender.refresh_materialized(
             interactions_df,
             events_df,
-            limit=limit
+            path=MATERIALIZED_RECS_PATH
         )
 
-        # Convert to frontend-friendly format
-        events_list = []
-        for _, event in recommendations.iterrows():
-            events_list.append({
-                'id': event['event_id'],
-                'title': event['title'],
-                'category': event['category'],
-                'location': event['location'],
-                'price': float(event['price']),
-                'image': f"https://images.unsplash.com/photo-{1550000000 + int(event['event_id'].split('_')[1])}",
-                'date': (datetime.now() + pd.Timedelta(days=int(event['event_id'].split('_')[1]) % 30)).strftime('%B %d, %Y'),
-                'tags': [event['category'].lower()]
-            })
+        return jsonify({
+            'success': True,
+            'users': len(recommender.materialized),
+            'refreshed': len(refreshed_users)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommendations/collaborative/refit', methods=['POST'])
+def refit_collaborative_model():
+    try:
+        # Warm-start from the current factors on a copy, then swap it in so
+        # concurrent requests never see a half-updated model
+        recommender = registry.get('recommendations')
+        model = copy.deepcopy(recommender.collaborative_model)
+        model.fit(interactions_df, warm_start=model.item_factors is not None)
+        if MODEL_DIR:
+            model.save(os.path.join(MODEL_DIR, 'collaborative'))
+        recommender.collaborative_model = model
 
         return jsonify({
             'success': True,
-            'events': events_list
+            'users': len(model.user_mapping),
+            'iterations': int(model.model.n_iter_)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -98,39 +357,57 @@ def get_trending_recommendations():
     category = request.args.get('category')
 
     try:
-        filters = {}
-        if category:
-            filters['category'] = category
-
-        trending_events = trend_model.get_trending_events(
-            events_df,
-            interactions_df,
-            filters=filters,
-            limit=limit
+        trending = trend_engine.top(limit=limit, category=category)
+        trending_ids = [event_id for event_id, _ in trending]
+        trending_events = events_by_id.loc[trending_ids].assign(
+            trend_score=[score for _, score in trending]
         )
 
         # Convert to frontend-friendly format
-        events_list = []
-        for _, event in trending_events.iterrows():
-            events_list.append({
-                'id': event['event_id'],
-                'title': event['title'],
-                'category': event['category'],
-                'location': event['location'],
-                'price': float(event['price']),
-                'image': f"https://images.unsplash.com/photo-{1550000000 + int(event['event_id'].split('_')[1])}",
-                'date': (datetime.now() + pd.Timedelta(days=int(event['event_id'].split('_')[1]) % 30)).strftime('%B %d, %Y'),
-                'tags': [event['category'].lower()],
-                'trend_score': float(event['trend_score']) if 'trend_score' in event else None
-            })
-
-        return jsonify({
+        return json_response({
             'success': True,
-            'events': events_list
+            'events': events_to_records(trending_events, score_column='trend_score', score_key='trend_score')
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/interactions', methods=['POST'])
+def record_interaction():
+    data = request.json
+
+    if not data or 'event_id' not in data or 'interaction_type' not in data:
+        return jsonify({'error': 'Event ID and interaction type are required'}), 400
+
+    try:
+        if data['event_id'] not in events_by_id.index:
+            return jsonify({'error': 'Unknown event ID'}), 400
+
+        timestamp = pd.Timestamp(data['timestamp']) if data.get('timestamp') else None
+        trend_engine.ingest(data['event_id'], data['interaction_type'], timestamp=timestamp)
+        if data['interaction_type'] == 'purchase':
+            registry.get('trends').record_purchase(data['event_id'])
+
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def forecast_to_records(forecast):
+    """Convert a forecast frame to the frontend-friendly list of daily points"""
+    return [
+        {
+            'date': date.strftime('%Y-%m-%d'),
+            'predicted_sales': float(predicted),
+            'lower_bound': float(lower),
+            'upper_bound': float(upper)
+        }
+        for date, predicted, lower, upper in zip(
+            forecast['date'],
+            forecast['predicted_sales'],
+            forecast['lower_bound'],
+            forecast['upper_bound']
+        )
+    ]
+
 @app.route('/api/analytics/sales-forecast', methods=['GET'])
 def get_sales_forecast():
     event_id = request.args.get('event_id')
@@ -140,25 +417,42 @@ def get_sales_forecast():
         return jsonify({'error': 'Event ID is required'}), 400
 
     try:
-        forecast = trend_model.forecast_ticket_sales(
+        forecast = registry.get('trends').forecast_ticket_sales(
             event_id,
             interactions_df,
             days_ahead=days_ahead
         )
 
-        # Convert to frontend-friendly format
-        forecast_data = []
-        for _, row in forecast.iterrows():
-            forecast_data.append({
-                'date': row['date'].strftime('%Y-%m-%d'),
-                'predicted_sales': float(row['predicted_sales']),
-                'lower_bound': float(row['lower_bound']),
-                'upper_bound': float(row['upper_bound'])
-            })
+        return jsonify({
+            'success': True,
+            'forecast': forecast_to_records(forecast)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/sales-forecast/batch', methods=['POST'])
+def get_sales_forecast_batch():
+    data = request.json
+
+    if not data or not data.get('event_ids'):
+        return jsonify({'error': 'Event IDs are required'}), 400
+    event_ids = data['event_ids']
+    if not isinstance(event_ids, list) or not all(isinstance(event_id, str) for event_id in event_ids):
+        return jsonify({'error': 'Event IDs must be a list of strings'}), 400
+
+    try:
+        forecasts = registry.get('trends').forecast_ticket_sales_batch(
+            event_ids,
+            interactions_df,
+            days_ahead=int(data.get('days_ahead', 30))
+        )
 
         return jsonify({
             'success': True,
-            'forecast': forecast_data
+            'forecasts': {
+                event_id: forecast_to_records(forecast)
+                for event_id, forecast in forecasts.items()
+            }
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -169,9 +463,11 @@ def analyze_sentiment():
 
     if not data or 'text' not in data:
         return jsonify({'error': 'Text content is required'}), 400
+    if not isinstance(data['text'], str):
+        return jsonify({'error': 'Text must be a string'}), 400
 
     try:
-        sentiment = sentiment_model.analyze(data['text'])
+        sentiment = sentiment_batcher(data['text'])
 
         return jsonify({
             'success': True,
@@ -180,6 +476,85 @@ def analyze_sentiment():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analytics/sentiment/cascade', methods=['GET'])
+def get_sentiment_cascade_stats():
+    """Escalation rate and per-tier latency of the VADER-first cascade"""
+    return jsonify({
+        'success': True,
+        'enabled': sentiment_model.cascade,
+        'stats': sentiment_model.cascade_stats()
+    })
+
+def score_review_stream(lines, batch_size, with_aspects):
+    """Score NDJSON review lines in fixed-size batches, yielding one NDJSON result per line"""
+    def flush(batch):
+        texts = [record['text'] for record in batch if 'text' in record]
+        model = registry.get('sentiment')
+        sentiments = iter(score_sentiments(texts))
+        for record in batch:
+            if 'text' not in record:
+                yield json.dumps(record) + '\n'
+                continue
+
+            result = {'id': record['id'], 'sentiment': next(sentiments)}
+            if with_aspects:
+                result['aspects'] = model.extract_aspects(record['text'])
+            yield json.dumps(result) + '\n'
+
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {'text': record}
+            if isinstance(record['text'], str):
+                batch.append({'id': record.get('id', line_number), 'text': record['text']})
+            else:
+                batch.append({'id': record.get('id', line_number), 'error': 'The text field must be a string'})
+        except (ValueError, KeyError, TypeError, AttributeError):
+            batch.append({'id': line_number, 'error': 'Each line must be a JSON object with a text field'})
+
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+
+    if batch:
+        yield from flush(batch)
+
+@app.route('/api/analytics/sentiment/bulk', methods=['POST'])
+def analyze_sentiment_bulk():
+    """
+    Score many reviews in one request. The body (or an uploaded 'file') is
+    NDJSON, one {"id": ..., "text": ...} object per line; results are
+    streamed back as NDJSON in the same order while the input is read.
+    """
+    try:
+        batch_size = int(request.args.get('batch_size', sentiment_model.batch_size))
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be a positive integer'}), 400
+    with_aspects = request.args.get('aspects', 'false').lower() in ('1', 'true', 'yes')
+
+    if 'file' in request.files:
+        # Detach the upload from the request: the request closes its files once
+        # the view returns, but the response keeps reading while it streams
+        upload = request.files['file']
+        lines, upload.stream = upload.stream, io.BytesIO()
+    else:
+        lines = request.stream
+
+    return Response(
+        stream_with_context(score_review_stream(lines, batch_size, with_aspects)),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/api/analytics/anomaly-detection', methods=['POST'])
 def detect_anomalies():
     data = request.json
@@ -188,7 +563,7 @@ def detect_anomalies():
         return jsonify({'error': 'Metrics data is required'}), 400
 
     try:
-        anomalies = anomaly_model.detect(data['metrics'])
+        anomalies = score_anomalies(data['metrics'])
 
         return jsonify({
             'success': True,
@@ -197,6 +572,40 @@ def detect_anomalies():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analytics/anomaly-detection/stream', methods=['POST'])
+def detect_stream_anomalies():
+    """Score live metric points ({event_id, metrics} or a list of them) against rolling baselines"""
+    data = request.json
+
+    if not data:
+        return jsonify({'error': 'Metrics data is required'}), 400
+
+    points = data if isinstance(data, list) else [data]
+    if not all(isinstance(point, dict) and isinstance(point.get('metrics'), dict) for point in points):
+        return jsonify({'error': 'Each point needs a metrics object'}), 400
+
+    try:
+        anomalies = [
+            streaming_anomaly_model.update(point.get('event_id'), point['metrics'])
+            for point in points
+        ]
+
+        return jsonify({
+            'success': True,
+            'anomalies': anomalies if isinstance(data, list) else anomalies[0]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/cache', methods=['GET'])
+def get_result_cache_stats():
+    """Hit rate and size of the sentiment/anomaly result cache"""
+    return jsonify({
+        'success': True,
+        'enabled': result_cache is not None,
+        'stats': result_cache.stats() if result_cache is not None else None
+    })
+
 @app.route('/api/analytics/pricing-optimization', methods=['GET'])
 def optimize_pricing():
     event_id = request.args.get('event_id')
@@ -209,7 +618,7 @@ def optimize_pricing():
         if current_price:
             current_price = float(current_price)
 
-        optimal_price = trend_model.optimize_pricing(
+        optimal_price = registry.get('trends').optimize_pricing(
             event_id,
             interactions_df,
             events_df,
@@ -0,0 +1,283 @@
+# ml-service/asgi.py
+"""
+Async (ASGI) front end for the ML service.
+
+CPU-heavy model calls (live recommendations, sentiment inference, anomaly
+detection, forecasting) run in a bounded process pool so they never block
+the event loop; cheap lookups (health, trending heaps, materialized
+recommendations) are answered on the loop. Each offloaded endpoint has a
+concurrency limit and a bounded wait queue, and answers 429 with a
+Retry-After hint when the queue is full. Every other route is served by the
+Flask app, mounted underneath.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+import app as service
+from models.data.columnar import save_frame
+from models.sentiment.batching import MicroBatcher
+from serialization import encode_json, events_to_records
+
+# (max concurrent, max queued) per offloaded endpoint, overridable as
+# e.g. ASGI_LIMIT_SENTIMENT=4,128. Sentiment requests are coalesced before
+# they reach the pool, so its limit is on requests per batch, not pool calls
+DEFAULT_LIMITS = {
+    'personalized': (4, 32),
+    'sentiment': (32, 64),
+    'anomaly': (2, 16),
+    'forecast': (2, 16),
+}
+
+def json_response(payload, status_code=200, headers=None):
+    return Response(encode_json(payload), status_code=status_code, headers=headers, media_type='application/json')
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+
+class EndpointLimiter:
+    """Bounded concurrency for one endpoint with a bounded queue of waiters"""
+
+    def __init__(self, max_concurrent, max_queued, retry_after=1):
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def run(self, fn, *args):
+        # Shed load instead of queueing without bound
+        if self._semaphore.locked() and self.waiting >= self.max_queued:
+            raise Overloaded(self.retry_after)
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        try:
+            return await fn(*args)
+        finally:
+            self._semaphore.release()
+
+def _limits(name):
+    value = os.environ.get(f'ASGI_LIMIT_{name.upper()}')
+    if value:
+        max_concurrent, max_queued = (int(part) for part in value.split(','))
+        return max_concurrent, max_queued
+    return DEFAULT_LIMITS[name]
+
+limiters = {name: EndpointLimiter(*_limits(name)) for name in DEFAULT_LIMITS}
+pool = None
+
+# Model calls executed in pool processes. Each worker process imports the
+# service module once (via _init_worker), which starts its model warmup, and
+# keeps the loaded models for later calls. Stage metrics recorded in pool
+# processes stay there; /metrics reports this process's request latencies.
+def _init_worker():
+    import app  # noqa: F401
+
+def _personalized(user_id, limit):
+    recommendations = service.registry.get('recommendations').get_recommendations(
+        user_id,
+        service.interactions_df,
+        service.events_df,
+        limit=limit
+    )
+    return events_to_records(recommendations)
+
+def _sentiments(texts):
+    return service.score_sentiments(texts)
+
+def _anomalies(metrics):
+    return service.score_anomalies(metrics)
+
+def _forecast(event_id, days_ahead):
+    forecast = service.registry.get('trends').forecast_ticket_sales(event_id, service.interactions_df, days_ahead=days_ahead)
+    return service.forecast_to_records(forecast)
+
+# A pool worker runs one call at a time, so single-text requests would never
+# meet in its own batcher; coalesce them here and send the pool whole batches
+sentiment_batcher = MicroBatcher(
+    lambda texts: pool.submit(_sentiments, texts).result(),
+    max_batch_size=service.sentiment_batcher.max_batch_size,
+    max_wait_ms=service.sentiment_batcher.max_wait * 1000
+)
+
+async def offload(endpoint, fn, *args):
+    """Run a model call in the process pool under the endpoint's limiter"""
+    loop = asyncio.get_running_loop()
+
+    async def call():
+        return await loop.run_in_executor(pool, fn, *args)
+
+    return await limiters[endpoint].run(call)
+
+# Routes
+async def health_check(request):
+    return json_response({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'ready': service.registry.ready(),
+        'models': service.registry.status()
+    })
+
+async def personalized_recommendations(request):
+    user_id = request.query_params.get('user_id')
+    limit = int(request.query_params.get('limit', 10))
+
+    if not user_id:
+        return json_response({'error': 'User ID is required'}, 400)
+
+    # Materialized recommendations are a lookup; only misses (or a request
+    # arriving before this process has loaded them) need the pool
+    recommendations = None
+    if service.registry.is_ready('recommendations'):
+        recommendations = service.hybrid_model.get_materialized_recommendations(
+            user_id, service.events_df, limit=limit
+        )
+    if recommendations is not None:
+        events = events_to_records(recommendations)
+    else:
+        events = await offload('personalized', _personalized, user_id, limit)
+
+    return json_response({'success': True, 'events': events})
+
+async def trending_recommendations(request):
+    limit = int(request.query_params.get('limit', 10))
+    category = request.query_params.get('category')
+
+    trending = service.trend_engine.top(limit=limit, category=category)
+    trending_events = service.events_by_id.loc[[event_id for event_id, _ in trending]].assign(
+        trend_score=[score for _, score in trending]
+    )
+
+    return json_response({
+        'success': True,
+        'events': events_to_records(trending_events, score_column='trend_score', score_key='trend_score')
+    })
+
+async def read_json(request):
+    """The parsed JSON body, or None if it is malformed (Flask answers those with 400 too)"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def analyze_sentiment(request):
+    data = await read_json(request)
+
+    if not isinstance(data, dict) or 'text' not in data:
+        return json_response({'error': 'Text content is required'}, 400)
+    if not isinstance(data['text'], str):
+        return json_response({'error': 'Text must be a string'}, 400)
+
+    async def call():
+        return await asyncio.wrap_future(sentiment_batcher.submit(data['text']))
+
+    sentiment = await limiters['sentiment'].run(call)
+    return json_response({'success': True, 'sentiment': sentiment})
+
+async def detect_anomalies(request):
+    data = await read_json(request)
+
+    if not isinstance(data, dict) or 'metrics' not in data:
+        return json_response({'error': 'Metrics data is required'}, 400)
+
+    anomalies = await offload('anomaly', _anomalies, data['metrics'])
+    return json_response({'success': True, 'anomalies': anomalies})
+
+async def sales_forecast(request):
+    event_id = request.query_params.get('event_id')
+    days_ahead = int(request.query_params.get('days_ahead', 30))
+
+    if not event_id:
+        return json_response({'error': 'Event ID is required'}, 400)
+
+    forecast = await offload('forecast', _forecast, event_id, days_ahead)
+    return json_response({'success': True, 'forecast': forecast})
+
+async def overloaded(request, exc):
+    return json_response(
+        {'error': 'Too many requests', 'retry_after': exc.retry_after},
+        429,
+        headers={'Retry-After': str(exc.retry_after)}
+    )
+
+async def server_error(request, exc):
+    return json_response({'error': str(exc)}, 500)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global pool
+    # Pool workers import app afresh and, without DATA_DIR, would each
+    # generate their own random sample data; hand them this process's instead
+    data_dir = None
+    if not service.DATA_DIR:
+        data_dir = tempfile.mkdtemp(prefix='ml-service-data-')
+        for name, frame in (('users', service.users_df), ('events', service.events_df),
+                            ('interactions', service.interactions_df)):
+            save_frame(os.path.join(data_dir, name), frame)
+        os.environ['DATA_DIR'] = data_dir
+
+    workers = int(os.environ.get('ML_POOL_WORKERS', os.cpu_count() or 1))
+    # spawn avoids forking a process that already runs model and batcher threads
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    )
+    try:
+        yield
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if data_dir is not None:
+            os.environ.pop('DATA_DIR', None)
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+def timed_route(path, endpoint, **kwargs):
+    """A Route whose requests are recorded in the same latency histogram as the Flask routes"""
+    async def timed_endpoint(request):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        except Overloaded:
+            status = 429
+            raise
+        finally:
+            service.observe_request(path, request.method, status, time.perf_counter() - start)
+
+    return Route(path, timed_endpoint, **kwargs)
+
+app = Starlette(
+    routes=[
+        timed_route('/api/health', health_check),
+        timed_route('/api/recommendations/personalized', personalized_recommendations),
+        timed_route('/api/recommendations/trending', trending_recommendations),
+        timed_route('/api/analytics/sentiment', analyze_sentiment, methods=['POST']),
+        timed_route('/api/analytics/anomaly-detection', detect_anomalies, methods=['POST']),
+        timed_route('/api/analytics/sales-forecast', sales_forecast),
+        # Everything else (including /metrics) is served by the Flask app
+        Mount('/', WSGIMiddleware(service.app)),
+    ],
+    exception_handlers={Overloaded: overloaded, Exception: server_error},
+    lifespan=lifespan,
+)
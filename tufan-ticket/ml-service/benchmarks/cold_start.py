@@ -0,0 +1,92 @@
+"""
+Cold-start cost of an ML service worker.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+  - importing app with WARMUP_MODELS=none (what a worker pays before it can
+    accept requests) and with the default background warmup
+  - loading each registered model on its own, i.e. the first request to an
+    endpoint that uses it
+  - the modules with the largest cumulative import time (python -X importtime)
+
+Run from the ml-service directory:
+    python -m benchmarks.cold_start --repeat 3 --top 15 --depth 1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_APP = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+if app.registry.warmup_thread is not None:
+    app.registry.warmup_thread.join()
+ready = time.perf_counter() - start
+print(json.dumps({'import': imported, 'ready': ready}))
+"""
+
+LOAD_MODEL = """
+import json, sys, time
+import app
+start = time.perf_counter()
+app.registry.get(sys.argv[1])
+print(json.dumps({'load': time.perf_counter() - start, 'status': app.registry.status()[sys.argv[1]]}))
+"""
+
+def run(code, *args, env=None, importtime=False):
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', code, *args]
+    result = subprocess.run(
+        command,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(stderr, top, depth):
+    """Imports nested at most depth levels deep, by cumulative time, from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        # Nested imports are indented two spaces per level under their parent
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level > depth:
+            continue
+        modules.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--depth', type=int, default=1, help='import nesting depth to report (0 is app itself)')
+    parser.add_argument('--models', nargs='+', default=['recommendations', 'sentiment', 'trends', 'anomaly'])
+    args = parser.parse_args()
+
+    print(f"{'warmup':>8}  {'import':>10}  {'ready':>10}")
+    for warmup in ('none', 'all'):
+        timings = [run(IMPORT_APP, env={'WARMUP_MODELS': warmup})[0] for _ in range(args.repeat)]
+        best_import = min(t['import'] for t in timings)
+        best_ready = min(t['ready'] for t in timings)
+        print(f'{warmup:>8}  {best_import:9.3f}s  {best_ready:9.3f}s')
+
+    print(f"\n{'model':>16}  {'first load':>10}")
+    for name in args.models:
+        timings = [run(LOAD_MODEL, name, env={'WARMUP_MODELS': 'none'})[0] for _ in range(args.repeat)]
+        print(f"{name:>16}  {min(t['load'] for t in timings):9.3f}s")
+
+    _, stderr = run(IMPORT_APP, env={'WARMUP_MODELS': 'none'}, importtime=True)
+    print(f"\n{'cumulative':>10}  module (import app, no warmup)")
+    for seconds, name in slowest_imports(stderr, args.top, args.depth):
+        print(f'{seconds:9.3f}s  {name}')
+
+if __name__ == '__main__':
+    main()
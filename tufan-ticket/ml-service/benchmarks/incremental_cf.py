@@ -0,0 +1,80 @@
+"""
+Incremental collaborative filtering updates vs. a full NMF refit.
+
+Fits on a base log, grows it with --growth new interactions (a mix of
+existing and new users), then times:
+  - a cold refit from a random init
+  - a warm-started refit from the previous factors
+  - folding in single users (the per-request path for new users)
+  - folding in every new/changed user as one batch
+and reports the reconstruction error of both refits.
+
+Run from the ml-service directory:
+    python -m benchmarks.incremental_cf --interactions 1000000 --users 100000 --events 10000
+"""
+import argparse
+import copy
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from models.recommendation.collaborative_filtering import CollaborativeFilteringModel
+
+def make_log(n_interactions, n_users, n_events, seed):
+    rng = np.random.RandomState(seed)
+    # Skewed user and event activity, like a real interaction log
+    users = np.minimum(rng.zipf(1.3, n_interactions), n_users) - 1
+    events = np.minimum(rng.zipf(1.2, n_interactions), n_events) - 1
+    return pd.DataFrame({
+        'user_id': np.char.add('user_', rng.permutation(n_users)[users].astype(str)),
+        'event_id': np.char.add('event_', rng.permutation(n_events)[events].astype(str)),
+        'interaction_type': rng.choice(['view', 'click', 'purchase'], n_interactions, p=[0.7, 0.2, 0.1]),
+        'timestamp': pd.Timestamp.now() - pd.to_timedelta(rng.randint(0, 30 * 86400, n_interactions), unit='s')
+    })
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interactions', type=int, default=500000)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--growth', type=float, default=0.02)
+    parser.add_argument('--single-users', type=int, default=100)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', module='sklearn')
+
+    base = make_log(args.interactions, args.users, args.events, seed=0)
+    # New interactions come from existing users and from users the base log has never seen
+    growth = make_log(int(args.interactions * args.growth), args.users * 2, args.events, seed=1)
+    grown = pd.concat([base, growth], ignore_index=True)
+
+    model = CollaborativeFilteringModel()
+    print(f'base fit: {timed(lambda: model.fit(base)):.2f}s on {len(base)} interactions')
+
+    changed = pd.unique(growth['user_id'])
+    new_users = [user_id for user_id in changed if user_id not in model.user_mapping]
+    print(f'growth: {len(growth)} interactions, {len(changed)} users changed, {len(new_users)} new')
+
+    cold = CollaborativeFilteringModel()
+    cold_s = timed(lambda: cold.fit(grown))
+    print(f'cold refit:  {cold_s:8.3f}s  {cold.model.n_iter_:3d} iters  error {cold.model.reconstruction_err_:.2f}')
+
+    warm = copy.deepcopy(model)
+    warm_s = timed(lambda: warm.fit(grown, warm_start=True))
+    print(f'warm refit:  {warm_s:8.3f}s  {warm.model.n_iter_:3d} iters  error {warm.model.reconstruction_err_:.2f}')
+
+    folded = copy.deepcopy(model)
+    single = new_users[:args.single_users]
+    single_s = timed(lambda: [folded.fold_in([user_id], grown) for user_id in single])
+    print(f'fold-in:     {single_s * 1000 / max(len(single), 1):8.3f}ms per single user')
+
+    batch_s = timed(lambda: folded.fold_in(changed, grown))
+    print(f'fold-in:     {batch_s:8.3f}s  for all {len(changed)} changed users in one batch')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Accuracy parity and CPU throughput of the sentiment inference backends.
+
+Scores a fixed review set with the float32 pytorch backend and each other
+backend, then reports for each:
+  - label agreement with the float model and the largest score difference
+  - texts/second at each batch size, over the review set repeated to
+    --texts texts
+
+Exits non-zero if a backend agrees with the float model on fewer than
+--min-agreement of the reviews, so it can gate a backend switch.
+
+Run from the ml-service directory:
+    python -m benchmarks.sentiment_backends --backends quantized onnx --batch-sizes 1 8 32
+"""
+import argparse
+import sys
+import time
+
+from models.sentiment.analyzer import SentimentAnalyzer
+
+REVIEWS = [
+    "Absolutely incredible show, the band played for almost three hours!",
+    "Worst concert I've been to. The sound was muddy and the queue took forever.",
+    "Decent venue, overpriced drinks, but the headliner made up for it.",
+    "The seats were great and the staff were friendly.",
+    "I couldn't hear a thing from the back row.",
+    "Tickets arrived on time and entry was quick.",
+    "The event was cancelled an hour before doors opened and we still haven't been refunded.",
+    "Not bad, not great.",
+    "Food trucks were amazing, especially the tacos.",
+    "Parking was a nightmare and security was rude.",
+    "Best night of the year, can't wait for the next one!",
+    "The opening act was boring but the main act was fantastic.",
+    "Too crowded to enjoy anything.",
+    "Great value for money.",
+    "The app crashed when I tried to show my ticket at the gate.",
+    "Lovely atmosphere and a really well organised festival.",
+    "Mediocre performance, they seemed tired.",
+    "Sound and lighting were top notch.",
+    "We left early, it was that disappointing.",
+    "Kids loved it, we'll definitely come back.",
+    "The stage was too far away and the screens were tiny.",
+    "Smooth checkout and the seat map was accurate.",
+    "Honestly a waste of money.",
+    "Surprisingly good for a free event.",
+    "The comedian was hilarious from start to finish.",
+    "Air conditioning was broken and it was unbearably hot.",
+    "Staff handled the rain delay really well.",
+    "The match was exciting but the stadium food was awful.",
+    "It was fine.",
+    "A magical evening, the orchestra was breathtaking.",
+    "Refund process was painless.",
+    "Bathrooms were disgusting.",
+]
+
+def throughput(analyzer, texts, batch_size):
+    start = time.perf_counter()
+    for offset in range(0, len(texts), batch_size):
+        analyzer.analyze_batch(texts[offset:offset + batch_size], batch_size=batch_size)
+    return len(texts) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backends', nargs='+', default=['quantized', 'onnx'])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--texts', type=int, default=512)
+    parser.add_argument('--min-agreement', type=float, default=0.95)
+    args = parser.parse_args()
+
+    texts = (REVIEWS * (args.texts // len(REVIEWS) + 1))[:args.texts]
+    backends = ['pytorch'] + [backend for backend in args.backends if backend != 'pytorch']
+
+    analyzers = {}
+    for backend in backends:
+        start = time.perf_counter()
+        analyzers[backend] = SentimentAnalyzer(backend=backend).load()
+        print(f'{backend:>10} loaded in {time.perf_counter() - start:.2f}s')
+
+    reference = analyzers['pytorch'].analyze_batch(REVIEWS)
+
+    columns = ['agreement', 'max |dscore|'] + [f'batch {size}/s' for size in args.batch_sizes]
+    print(f"\n{'backend':>10}  " + '  '.join(f'{name:>12}' for name in columns))
+
+    failed = []
+    for backend in backends:
+        analyzer = analyzers[backend]
+        results = analyzer.analyze_batch(REVIEWS)
+        agreement = sum(
+            result['sentiment'] == expected['sentiment'] for result, expected in zip(results, reference)
+        ) / len(REVIEWS)
+        max_diff = max(abs(result['score'] - expected['score']) for result, expected in zip(results, reference))
+        if agreement < args.min_agreement:
+            failed.append(backend)
+
+        # One untimed pass so lazy initialization isn't measured
+        analyzer.analyze_batch(texts[:max(args.batch_sizes)])
+        rates = [throughput(analyzer, texts, size) for size in args.batch_sizes]
+
+        cells = [f'{agreement:12.1%}', f'{max_diff:12.4f}'] + [f'{rate:12.1f}' for rate in rates]
+        print(f'{backend:>10}  ' + '  '.join(cells))
+
+    if failed:
+        print(f"\nBelow {args.min_agreement:.0%} agreement with the float model: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Startup cost of getting the interaction log into memory.
+
+For each log size this times:
+  - synthesizing timestamps with the previous per-row pd.Timedelta list
+    comprehension vs. one vectorized to_timedelta (legacy up to --legacy-max)
+  - writing the time-partitioned InteractionLog and reading it back, in full
+    and for a recent window
+  - ingesting the same rows from Parquet (when pyarrow is installed)
+  - building the InteractionStore the models use on first request
+
+Run from the ml-service directory:
+    python -m benchmarks.startup --sizes 100000 1000000 10000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from models.data.interaction_log import InteractionLog, pq
+from models.data.interactions import InteractionStore
+
+def make_interactions(n_interactions, n_users=1000000, n_events=50000, days=30, seed=0):
+    rng = np.random.RandomState(seed)
+    user_categories = pd.Index([f'user_{i}' for i in range(n_users)])
+    event_categories = pd.Index([f'event_{i}' for i in range(n_events)])
+    seconds_ago = rng.randint(0, days * 86400, n_interactions).astype('timedelta64[s]')
+    return pd.DataFrame({
+        'user_id': pd.Categorical.from_codes(rng.randint(0, n_users, n_interactions), user_categories),
+        'event_id': pd.Categorical.from_codes(rng.randint(0, n_events, n_interactions), event_categories),
+        'interaction_type': pd.Categorical.from_codes(
+            rng.randint(0, 3, n_interactions), ['view', 'click', 'purchase']
+        ),
+        'timestamp': np.datetime64(datetime.now(), 'ns') - seconds_ago
+    })
+
+def legacy_timestamps(n):
+    """The previous per-row timestamp synthesis in load_sample_data()"""
+    return [datetime.now() - pd.Timedelta(days=np.random.randint(1, 30)) for _ in range(n)]
+
+def vectorized_timestamps(n):
+    return datetime.now() - pd.to_timedelta(np.random.randint(1, 30, n), unit='D')
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000, 10000000])
+    parser.add_argument('--legacy-max', type=int, default=1000000)
+    parser.add_argument('--window-days', type=int, default=7)
+    args = parser.parse_args()
+
+    columns = ['synth legacy', 'synth vec', 'log write', 'read all', 'read window', 'parquet in', 'store build']
+    print(f"{'interactions':>12}  " + '  '.join(f'{name:>12}' for name in columns))
+
+    for n in args.sizes:
+        interactions = make_interactions(n)
+        row = {}
+
+        if n <= args.legacy_max:
+            row['synth legacy'], _ = timed(lambda: legacy_timestamps(n))
+        row['synth vec'], _ = timed(lambda: vectorized_timestamps(n))
+
+        workdir = tempfile.mkdtemp()
+        try:
+            log = InteractionLog(os.path.join(workdir, 'log'))
+            row['log write'], _ = timed(lambda: log.append(interactions))
+            row['read all'], full = timed(log.read)
+            window_start = datetime.now() - pd.Timedelta(days=args.window_days)
+            row['read window'], _ = timed(lambda: log.read(start=window_start))
+
+            if pq is not None:
+                parquet_path = os.path.join(workdir, 'interactions.parquet')
+                interactions.to_parquet(parquet_path)
+                parquet_log = InteractionLog(os.path.join(workdir, 'parquet_log'))
+                row['parquet in'], _ = timed(lambda: parquet_log.append_parquet(parquet_path))
+
+            row['store build'], _ = timed(lambda: InteractionStore(full))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        cells = [f'{row[name]:11.3f}s' if name in row else f"{'-':>12}" for name in columns]
+        print(f'{n:>12}  ' + '  '.join(cells))
+
+if __name__ == '__main__':
+    main()
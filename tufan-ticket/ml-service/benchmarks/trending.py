@@ -0,0 +1,90 @@
+"""
+Scaling of TrendForecaster.get_trending_events with the interaction log size.
+
+Compares the vectorized implementation against the previous row-wise
+.apply() version (up to --legacy-max rows, since it is very slow), timing
+the store build separately from the per-request scoring.
+
+Run from the ml-service directory:
+    python -m benchmarks.trending --sizes 10000 1000000 10000000 50000000
+"""
+import argparse
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from models.data.interactions import InteractionStore, get_interaction_store
+from models.trends.forecasting import TrendForecaster
+
+def make_data(n_interactions, n_users=1000000, n_events=50000, seed=0):
+    rng = np.random.RandomState(seed)
+    events = pd.DataFrame({
+        'event_id': [f'event_{i}' for i in range(n_events)],
+        'title': [f'Event Title {i}' for i in range(n_events)],
+        'category': rng.choice(['Music', 'Sports', 'Arts', 'Food', 'Tech'], n_events),
+        'location': rng.choice(['New York', 'Los Angeles', 'Chicago'], n_events),
+        'price': rng.randint(20, 200, n_events)
+    })
+
+    # Categorical ID columns keep 50M-row logs within memory
+    user_categories = pd.Index([f'user_{i}' for i in range(n_users)])
+    seconds_ago = rng.randint(0, 30 * 86400, n_interactions).astype('timedelta64[s]')
+    interactions = pd.DataFrame({
+        'user_id': pd.Categorical.from_codes(rng.randint(0, n_users, n_interactions), user_categories),
+        'event_id': pd.Categorical.from_codes(rng.randint(0, n_events, n_interactions), events['event_id']),
+        'interaction_type': pd.Categorical.from_codes(
+            rng.randint(0, 3, n_interactions), ['view', 'click', 'purchase']
+        ),
+        'timestamp': np.datetime64(datetime.now(), 'ns') - seconds_ago
+    })
+
+    return events, interactions
+
+def legacy_trending(events_df, interactions_df, limit=10):
+    """The previous row-wise implementation, kept for comparison"""
+    events = events_df.copy()
+    interactions = interactions_df.copy()
+    now = datetime.now()
+    interactions['days_ago'] = interactions['timestamp'].apply(lambda x: (now - x).days)
+    interactions['weight'] = interactions['days_ago'].apply(lambda days: np.exp(-0.1 * days))
+    interaction_weights = {'view': 1, 'click': 3, 'purchase': 10}
+    interactions['type_weight'] = interactions['interaction_type'].map(interaction_weights).astype(float)
+    interactions['final_weight'] = interactions['weight'] * interactions['type_weight']
+    trend_scores = interactions.groupby('event_id', observed=True)['final_weight'].sum().reset_index()
+    trend_scores = trend_scores.rename(columns={'final_weight': 'trend_score'})
+    trend_scores['event_id'] = trend_scores['event_id'].astype(str)
+    trending_events = events.merge(trend_scores, on='event_id', how='inner')
+    return trending_events.sort_values('trend_score', ascending=False).head(limit)
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000, 10000000])
+    parser.add_argument('--legacy-max', type=int, default=1000000)
+    args = parser.parse_args()
+
+    forecaster = TrendForecaster()
+    print(f"{'interactions':>12}  {'store build':>11}  {'vectorized':>10}  {'legacy':>10}")
+
+    for n in args.sizes:
+        events, interactions = make_data(n)
+        build_s = timed(lambda: InteractionStore(interactions), repeat=1)
+        get_interaction_store(interactions)
+        vectorized_s = timed(lambda: forecaster.get_trending_events(events, interactions, filters={'category': 'Music'}))
+
+        legacy = '-'
+        if n <= args.legacy_max:
+            legacy = f"{timed(lambda: legacy_trending(events, interactions), repeat=1):9.3f}s"
+
+        print(f"{n:>12}  {build_s:10.3f}s  {vectorized_s:9.3f}s  {legacy:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Recall vs. latency of the approximate vector index against the exact baseline.
+
+Run from the ml-service directory:
+    python -m benchmarks.vector_index --items 50000 --queries 200
+"""
+import argparse
+import time
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from models.recommendation.vector_index import ExactIndex, IVFIndex
+
+def run(name, vectors, queries, k, probes):
+    exact = ExactIndex().build(vectors)
+
+    start = time.perf_counter()
+    truth = [set(exact.search(q, k)[0]) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"\n{name}: {vectors.shape[0]} items x {vectors.shape[1]} dims")
+    print(f"  {'exact':>12}  recall@{k}=1.000  {exact_ms:8.3f} ms/query")
+
+    start = time.perf_counter()
+    ivf = IVFIndex().build(vectors)
+    build_s = time.perf_counter() - start
+    print(f"  ivf build: {build_s:.2f} s, {len(ivf.centroids)} lists")
+
+    for n_probe in probes:
+        ivf.n_probe = n_probe
+        start = time.perf_counter()
+        found = [set(ivf.search(q, k)[0]) for q in queries]
+        ivf_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(f & t) / k for f, t in zip(found, truth)])
+        print(f"  {'ivf/' + str(n_probe):>12}  recall@{k}={recall:.3f}  {ivf_ms:8.3f} ms/query")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--factors', type=int, default=20)
+    parser.add_argument('--features', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    probes = [1, 4, 8, 16, 32]
+
+    # NMF-like non-negative item factors, queried with user factor vectors
+    item_factors = rng.gamma(0.5, 1.0, size=(args.items, args.factors))
+    user_factors = rng.gamma(0.5, 1.0, size=(args.queries, args.factors))
+    run('item factors', item_factors, user_factors, args.k, probes)
+
+    # L2-normalized sparse TF-IDF-like rows drawn from topical vocabularies
+    # (like title/category/location text), queried with existing rows
+    n_topics = 100
+    topic_terms = args.features // n_topics
+    topics = rng.randint(0, n_topics, args.items)
+    cols = topics[:, None] * topic_terms + rng.randint(0, topic_terms, (args.items, 8))
+    cols = np.hstack([cols, rng.randint(0, args.features, (args.items, 2))])
+    rows = np.repeat(np.arange(args.items), cols.shape[1])
+    tfidf = sp.csr_matrix(
+        (rng.uniform(0.5, 1.5, rows.size), (rows, cols.ravel())),
+        shape=(args.items, args.features)
+    )
+    tfidf = normalize(tfidf)
+    run('tf-idf', tfidf, [tfidf[i] for i in range(args.queries)], args.k, probes)
+
+if __name__ == '__main__':
+    main()
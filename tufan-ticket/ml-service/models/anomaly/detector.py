@@ -1,28 +1,79 @@
+import os
+import uuid
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+from models.data.artifacts import publish, read_meta, staging_path, write_meta
+from models.metrics import timed
+
+def explain(anomalous_features):
+    """Human-readable explanations for the top 3 most anomalous features"""
+    return [
+        f"{feature['feature']} is unusually {feature['direction']} "
+        f"({feature['value']:.2f}, {feature['z_score']:.2f} std. dev.)"
+        for feature in anomalous_features[:3]
+    ]
+
+def _make_model(contamination):
+    """An unfitted isolation forest and scaler; sklearn is imported on first use"""
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import StandardScaler
+    
+    model = IsolationForest(
+        n_estimators=100,
+        max_samples='auto',
+        contamination=contamination,
+        random_state=42
+    )
+    return model, StandardScaler()
 
 class AnomalyDetector:
     def __init__(self, contamination=0.05):
-        self.model = IsolationForest(
-            n_estimators=100,
-            max_samples='auto',
-            contamination=contamination,
-            random_state=42
-        )
-        self.scaler = StandardScaler()
+        self.contamination = contamination
+        # Created on fit (or load); unfitted detectors score with a temporary model
+        self.model = None
+        self.scaler = None
+        # Changes on every fit, so results cached for a previous model are not reused
+        self.version = 'unfitted'
     
     def fit(self, data):
         """Fit the anomaly detection model on historical data"""
+        self.model, self.scaler = _make_model(self.contamination)
+        
         # Standardize data
         scaled_data = self.scaler.fit_transform(data)
         
         # Fit the isolation forest model
         self.model.fit(scaled_data)
+        self.version = uuid.uuid4().hex
         
         return self
     
+    def save(self, path):
+        """Persist the fitted scaler and isolation forest to a directory"""
+        tmp_path = staging_path(path)
+        write_meta(tmp_path, {'contamination': self.contamination, 'version': self.version})
+        joblib.dump(
+            {'model': self.model, 'scaler': self.scaler},
+            os.path.join(tmp_path, 'detector.joblib')
+        )
+        publish(tmp_path, path)
+        
+        return self
+    
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a detector saved with save(); large arrays are memory-mapped"""
+        meta = read_meta(path)
+        detector = cls(contamination=meta['contamination'])
+        
+        state = joblib.load(os.path.join(path, 'detector.joblib'), mmap_mode=mmap_mode)
+        detector.model = state['model']
+        detector.scaler = state['scaler']
+        detector.version = meta.get('version', 'unversioned')
+        
+        return detector
+    
     def detect(self, metrics, event_id=None):
         """
         Detect anomalies in event metrics
@@ -43,85 +94,102 @@ class AnomalyDetector:
         if isinstance(metrics, dict):
             df = pd.DataFrame([metrics])
         elif isinstance(metrics, pd.DataFrame):
-            df = metrics.copy()
+            df = metrics
         else:
             raise ValueError("Metrics must be a dict or DataFrame")
         
-        # Check if model is fitted
-        if not hasattr(self.model, 'offset_'):
-            # If not fitted, create a temporary model
-            temp_model = IsolationForest(
-                n_estimators=100,
-                max_samples='auto',
-                contamination=0.05,
-                random_state=42
-            )
-            temp_scaler = StandardScaler()
-            
-            # Fit on the current data (not ideal, but works for one-off detection)
-            scaled_data = temp_scaler.fit_transform(df.select_dtypes(include=[np.number]))
-            temp_model.fit(scaled_data)
+        return self._detect_frame(df, [event_id] * len(df))[0]
+    
+    def detect_batch(self, metrics_batch):
+        """
+        Detect anomalies in a batch of metrics data
+        
+        All rows are scaled and scored in a single pass. Z-score explanations
+        are computed against the whole batch, and an unfitted detector fits
+        one temporary model on the batch rather than one per row.
+        
+        Parameters:
+        -----------
+        metrics_batch : list of dict or DataFrame
+            One metrics record per row; an 'event_id' field, if present, is
+            carried through to the result
             
-            # Use the temporary model and scaler
-            model = temp_model
-            scaler = temp_scaler
-        else:
-            model = self.model
-            scaler = self.scaler
+        Returns:
+        --------
+        list of dict
+            One result per row, in the same format as detect()
+        """
+        df = metrics_batch if isinstance(metrics_batch, pd.DataFrame) else pd.DataFrame(list(metrics_batch))
+        if df.empty:
+            return []
+        
+        event_ids = [None] * len(df)
+        if 'event_id' in df.columns:
+            event_ids = [None if pd.isna(event_id) else event_id for event_id in df['event_id']]
+        return self._detect_frame(df, event_ids)
+    
+    def _resolve_model(self, features):
+        """The fitted model and scaler, or a temporary pair fitted on the data itself"""
+        # Check if model is fitted
+        if hasattr(self.model, 'offset_'):
+            return self.model, self.scaler
+        
+        # If not fitted, create a temporary model
+        temp_model, temp_scaler = _make_model(0.05)
         
+        # Fit on the current data (not ideal, but works for one-off detection)
+        temp_model.fit(temp_scaler.fit_transform(features))
+        
+        return temp_model, temp_scaler
+    
+    @timed('anomaly.detect')
+    def _detect_frame(self, df, event_ids):
+        """Score every row of a metrics frame with one scaler transform and one forest pass"""
         # Prepare features for detection
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        features = df[numeric_cols].copy()
-        
-        # Scale features
-        scaled_features = scaler.transform(features)
-        
-        # Predict anomalies
-        # -1 for anomalies, 1 for normal data points
-        predictions = model.predict(scaled_features)
-        anomaly_scores = model.decision_function(scaled_features)
-        
-        # Identify the most anomalous features
-        anomalous_features = []
-        if predictions[0] == -1:  # If anomaly detected
-            # Calculate z-scores for each feature
-            z_scores = np.abs((features - features.mean()) / features.std())
+        features = df.select_dtypes(include=[np.number])
+        columns = features.columns
+        values = features.to_numpy(dtype=np.float64)
+        
+        model, scaler = self._resolve_model(features)
+        
+        # decision_function < 0 is exactly what predict() labels -1 (anomaly)
+        anomaly_scores = model.decision_function(scaler.transform(features))
+        is_anomaly = anomaly_scores < 0
+        
+        # Calculate z-scores for each feature across the rows
+        mean = values.mean(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = np.abs((values - mean) / values.std(axis=0, ddof=1))
+        
+        # More than 2 standard deviations from mean, for anomalous rows only
+        flagged = (z_scores > 2) & is_anomaly[:, None]
+        
+        results = []
+        for i, event_id in enumerate(event_ids):
+            # Get the features with the highest z-scores (most anomalous first)
+            anomalous_features = [
+                {
+                    'feature': columns[j],
+                    'value': float(values[i, j]),
+                    'z_score': float(z_scores[i, j]),
+                    'direction': 'high' if values[i, j] > mean[j] else 'low'
+                }
+                for j in np.flatnonzero(flagged[i])
+            ]
+            anomalous_features.sort(key=lambda x: x['z_score'], reverse=True)
             
-            # Get the features with the highest z-scores
-            for col in z_scores.columns:
-                score = z_scores[col].values[0]
-                if score > 2:  # More than 2 standard deviations from mean
-                    anomalous_features.append({
-                        'feature': col,
-                        'value': features[col].values[0],
-                        'z_score': score,
-                        'direction': 'high' if features[col].values[0] > features[col].mean().item() else 'low'
-                    })
+            # Create result
+            result = {
+                'is_anomaly': bool(is_anomaly[i]),
+                'anomaly_score': float(anomaly_scores[i]),
+                'anomalous_features': anomalous_features,
+                'event_id': event_id
+            }
             
-            # Sort by z-score (most anomalous first)
-            anomalous_features.sort(key=lambda x: x['z_score'], reverse=True)
-        
-        # Create result
-        result = {
-            'is_anomaly': predictions[0] == -1,
-            'anomaly_score': anomaly_scores[0],
-            'anomalous_features': anomalous_features,
-            'event_id': event_id
-        }
-        
-        # Generate explanation if anomaly detected
-        if result['is_anomaly'] and anomalous_features:
-            explanations = []
-            for feature in anomalous_features[:3]:  # Top 3 most anomalous features
-                explanations.append(
-                    f"{feature['feature']} is unusually {feature['direction']} "
-                    f"({feature['value']:.2f}, {feature['z_score']:.2f} std. dev.)"
-                )
+            # Generate explanation if anomaly detected
+            if result['is_anomaly'] and anomalous_features:
+                result['explanation'] = explain(anomalous_features)
             
-            result['explanation'] = explanations
+            results.append(result)
         
-        return result
-    
-    def detect_batch(self, metrics_batch):
-        """Detect anomalies in a batch of metrics data"""
-        return [self.detect(metrics) for metrics in metrics_batch]
\ No newline at end of file
+        return results
@@ -0,0 +1,138 @@
+import random
+import threading
+import numpy as np
+from models.anomaly.detector import AnomalyDetector, explain
+
+class RunningStats:
+    """Welford running mean/variance and an EWMA for one metric series"""
+
+    __slots__ = ('count', 'mean', 'm2', 'ewma')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = None
+
+    def update(self, value, alpha):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.ewma = value if self.ewma is None else alpha * value + (1 - alpha) * self.ewma
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+class StreamingAnomalyDetector:
+    """
+    Anomaly detection over live metric streams (ticket sales, traffic, ...).
+
+    Each (event, metric) series keeps constant-size running statistics, and
+    every incoming point is scored against its series' baseline before being
+    folded in. Points are also reservoir-sampled, and every refit_every points
+    an IsolationForest is refitted on the sample in a background thread; the
+    new model is swapped in when ready, so scoring never waits on a fit.
+    """
+
+    def __init__(self, z_threshold=3.0, ewma_alpha=0.1, min_history=10,
+                 reservoir_size=5000, refit_every=1000, contamination=0.05):
+        self.z_threshold = z_threshold
+        self.ewma_alpha = ewma_alpha
+        self.min_history = min_history
+        self.reservoir_size = reservoir_size
+        self.refit_every = refit_every
+        self.contamination = contamination
+
+        self.stats = {}
+        self.feature_names = None
+        self.reservoir = []
+        self.points_seen = 0
+        self.forest = None
+        self._refit_thread = None
+        self._lock = threading.Lock()
+
+    def update(self, event_id, metrics):
+        """Score one incoming metrics point for an event, then add it to the baselines"""
+        values = {
+            name: float(value) for name, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+
+        with self._lock:
+            if self.feature_names is None:
+                self.feature_names = sorted(values)
+
+            anomalous_features = []
+            for name, value in values.items():
+                stats = self.stats.get((event_id, name))
+                if stats is None:
+                    stats = self.stats[(event_id, name)] = RunningStats()
+
+                # Compare against the baseline before this point is included
+                std = stats.std
+                if stats.count >= self.min_history and std > 0:
+                    z_score = float(abs(value - stats.mean) / std)
+                    if z_score > self.z_threshold:
+                        anomalous_features.append({
+                            'feature': name,
+                            'value': value,
+                            'z_score': z_score,
+                            'direction': 'high' if value > stats.mean else 'low',
+                            'baseline': stats.ewma
+                        })
+
+                stats.update(value, self.ewma_alpha)
+
+            # Only points with the full feature set feed the forest
+            vector = None
+            if self.feature_names and all(name in values for name in self.feature_names):
+                vector = np.array([values[name] for name in self.feature_names])
+                self._sample(vector)
+
+            forest = self.forest
+            self._maybe_refit()
+
+        anomaly_score = None
+        if forest is not None and vector is not None:
+            anomaly_score = float(forest.model.decision_function(forest.scaler.transform(vector[None, :]))[0])
+
+        anomalous_features.sort(key=lambda x: x['z_score'], reverse=True)
+        result = {
+            'is_anomaly': bool(anomalous_features) or (anomaly_score is not None and anomaly_score < 0),
+            'anomaly_score': anomaly_score,
+            'anomalous_features': anomalous_features,
+            'event_id': event_id
+        }
+
+        if result['is_anomaly'] and anomalous_features:
+            result['explanation'] = explain(anomalous_features)
+
+        return result
+
+    def _sample(self, vector):
+        """Reservoir sampling (Algorithm R) over all full-feature points"""
+        self.points_seen += 1
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(vector)
+        else:
+            slot = random.randrange(self.points_seen)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = vector
+
+    def _maybe_refit(self):
+        """Start a background refit every refit_every points unless one is running"""
+        if self.points_seen == 0 or self.points_seen % self.refit_every:
+            return
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            return
+
+        sample = np.vstack(self.reservoir)
+        self._refit_thread = threading.Thread(target=self._refit, args=(sample,), daemon=True)
+        self._refit_thread.start()
+
+    def _refit(self, sample):
+        detector = AnomalyDetector(contamination=self.contamination).fit(sample)
+        # A single reference assignment, so scorers see either the old or new model
+        self.forest = detector
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from models.metrics import metrics
+
+def normalize_text(text):
+    """Texts that differ only in surrounding or repeated whitespace share a key"""
+    return ' '.join(str(text).split())
+
+def normalize_payload(payload):
+    """Canonical JSON, so dicts with the same items in any order share a key"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+
+def result_key(namespace, version, normalized):
+    digest = hashlib.sha256(f'{namespace}\0{version}\0{normalized}'.encode('utf-8')).hexdigest()
+    return f'{namespace}:{digest}'
+
+class Uncached:
+    """A computed result to return but not store, e.g. a degraded fallback"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+class MemoryBackend:
+    """Per-process LRU dict with expiry times"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys, now):
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, items, expires_at):
+        """Store items; returns how many entries were evicted to make room"""
+        evicted = 0
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            prefix = f'{namespace}:'
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteBackend:
+    """
+    LRU table in a local SQLite file, shared by every worker on the host
+    (point it at /dev/shm to keep it in memory). Values are stored as JSON.
+    """
+
+    # Trim back to max_entries after this fraction of it has been inserted
+    TRIM_FRACTION = 0.1
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._inserted = 0
+        self._lock = threading.Lock()
+
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)')
+        connection.commit()
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get_many(self, keys, now):
+        connection = self._connection()
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = connection.execute(
+                f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                [*chunk, now]
+            ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+
+        if found:
+            connection.executemany('UPDATE results SET used_at = ? WHERE key = ?', [(now, key) for key in found])
+            connection.commit()
+        return found
+
+    def set_many(self, items, expires_at):
+        connection = self._connection()
+        now = time.time()
+        connection.executemany(
+            'INSERT OR REPLACE INTO results (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)',
+            [(key, json.dumps(value), expires_at, now) for key, value in items.items()]
+        )
+        connection.commit()
+
+        with self._lock:
+            self._inserted += len(items)
+            if self._inserted < max(1, int(self.max_entries * self.TRIM_FRACTION)):
+                return 0
+            self._inserted = 0
+
+        # Expired rows go first, then the least recently used beyond max_entries
+        evicted = connection.execute('DELETE FROM results WHERE expires_at <= ?', (now,)).rowcount
+        evicted += connection.execute(
+            'DELETE FROM results WHERE key IN '
+            '(SELECT key FROM results ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        connection.commit()
+        return evicted
+
+    def invalidate(self, namespace=None):
+        connection = self._connection()
+        if namespace is None:
+            connection.execute('DELETE FROM results')
+        else:
+            connection.execute('DELETE FROM results WHERE key LIKE ?', (f'{namespace}:%',))
+        connection.commit()
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+class ResultCache:
+    """
+    Bounded LRU/TTL cache of model results, keyed by a hash of the
+    namespace, the model version and the normalized input.
+
+    Keying on the model version means a refit or reloaded model never
+    serves results computed by its predecessor; those entries simply age
+    out. The memory backend is per process; the sqlite backend is a local
+    file shared by all workers on the host.
+
+    Cached values are returned as-is (the memory backend hands out the
+    stored objects), so callers must not mutate them.
+    """
+
+    def __init__(self, backend='memory', path=None, max_entries=10000, ttl_seconds=3600):
+        self.ttl_seconds = ttl_seconds
+        if backend == 'memory':
+            self.backend = MemoryBackend(max_entries)
+        elif backend == 'sqlite':
+            if not path:
+                raise ValueError('The sqlite result cache needs a path')
+            self.backend = SQLiteBackend(path, max_entries)
+        else:
+            raise ValueError(f'Unknown result cache backend: {backend}')
+
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def get_or_compute(self, namespace, version, items, compute, normalize=normalize_payload):
+        """
+        Results for a list of items, running compute(list) only on the
+        distinct items that are not cached, then storing their results.
+        Results that compute wraps in Uncached are returned but not stored.
+        """
+        keys = [result_key(namespace, version, normalize(item)) for item in items]
+        found = self.backend.get_many(list(dict.fromkeys(keys)), time.time()) if keys else {}
+
+        # Compute each distinct missing key once, however often it repeats
+        missing = {}
+        for key, item in zip(keys, items):
+            if key not in found and key not in missing:
+                missing[key] = item
+
+        evicted = 0
+        if missing:
+            computed = dict(zip(missing, compute(list(missing.values()))))
+            storable = {key: value for key, value in computed.items() if not isinstance(value, Uncached)}
+            if storable:
+                evicted = self.backend.set_many(storable, time.time() + self.ttl_seconds)
+            found.update(
+                (key, value.value if isinstance(value, Uncached) else value) for key, value in computed.items()
+            )
+
+        hits = sum(1 for key in keys if key not in missing)
+        self._count(namespace, hits, len(keys) - hits, evicted)
+        return [found[key] for key in keys]
+
+    def get_or_compute_one(self, namespace, version, item, compute, normalize=normalize_payload):
+        return self.get_or_compute(namespace, version, [item], lambda batch: [compute(batch[0])], normalize)[0]
+
+    def invalidate(self, namespace=None):
+        """Drop every cached result, or only one namespace's"""
+        self.backend.invalidate(namespace)
+
+    def _count(self, namespace, hits, misses, evicted):
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'evictions': 0})
+            stats['hits'] += hits
+            stats['misses'] += misses
+            stats['evictions'] += evicted
+        metrics.counter('ml_result_cache_hits_total', hits, namespace=namespace)
+        metrics.counter('ml_result_cache_misses_total', misses, namespace=namespace)
+
+    def stats(self):
+        """Hits, misses, evictions and hit rate per namespace (this process), plus the entry count"""
+        with self._lock:
+            namespaces = {name: dict(stats) for name, stats in self._stats.items()}
+
+        for stats in namespaces.values():
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+
+        return {'entries': len(self.backend), 'namespaces': namespaces}
@@ -0,0 +1,124 @@
+import glob
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+
+META_FILE = 'meta.json'
+
+# Superseded artifact versions younger than this are kept by publish()
+STALE_VERSION_SECONDS = 60
+
+def save_arrays(path, **arrays):
+    """Write each array to <path>/<name>.npy"""
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array, allow_pickle=False)
+
+def load_array(path, name, mmap_mode='r'):
+    """Load <path>/<name>.npy, memory-mapped by default"""
+    return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+
+def write_meta(path, meta):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+def has_artifact(path):
+    return os.path.exists(os.path.join(path, META_FILE))
+
+def id_array(ids):
+    """
+    Encode IDs as a fixed-width array so it can be memory-mapped. Numeric
+    IDs keep their dtype, and so their sort order; anything else becomes
+    unicode.
+    """
+    ids = np.asarray(ids)
+    if len(ids) and ids.dtype.kind in 'biuf':
+        return ids
+    return ids.astype(str)
+
+def staging_path(path):
+    """Temporary sibling directory, unique to the caller, to write an artifact into before publish()"""
+    return f'{path}.tmp-{os.getpid()}-{uuid.uuid4().hex}'
+
+def publish(tmp_path, path):
+    """
+    Make a fully written tmp_path the artifact at path.
+
+    path is a symlink to a versioned sibling directory and is swapped with
+    a single rename, so a reader always finds either the old or the new
+    version. The version it replaces is kept for readers still loading it;
+    versions older than that are removed once they are stale.
+    """
+    version_path = f'{path}.v-{uuid.uuid4().hex}'
+    os.replace(tmp_path, version_path)
+
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if previous is None and os.path.isdir(path):
+        # Published before versioning: a directory can't be swapped for a
+        # symlink in one rename, so move it aside first (once)
+        previous = f'{path}.v-{uuid.uuid4().hex}'
+        os.replace(path, previous)
+
+    link_path = f'{path}.link-{uuid.uuid4().hex}'
+    os.symlink(os.path.basename(version_path), link_path)
+    os.replace(link_path, path)
+
+    # Leave alone anything a concurrent publish may have just written or linked
+    cutoff = time.time() - STALE_VERSION_SECONDS
+    keep = {os.path.realpath(kept) for kept in (path, version_path, previous) if kept is not None}
+    for old_path in glob.glob(f'{glob.escape(path)}.v-*'):
+        if os.path.realpath(old_path) in keep:
+            continue
+        try:
+            stale = os.path.getmtime(old_path) < cutoff
+        except FileNotFoundError:
+            # Already removed by another publish
+            continue
+        if stale:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+class SortedIdMapping:
+    """
+    Read-only id -> index mapping over a sorted ID array.
+
+    Lookups are a binary search, so the mapping needs no hash table and
+    can sit directly on a memory-mapped array.
+    """
+
+    def __init__(self, ids):
+        if len(ids) > 1 and not (ids[:-1] <= ids[1:]).all():
+            raise ValueError('SortedIdMapping needs IDs in sorted order')
+        self.ids = ids
+
+    def get(self, key, default=None):
+        try:
+            idx = int(np.searchsorted(self.ids, key))
+        except TypeError:
+            # A key that doesn't compare with the IDs (e.g. None) isn't one of them
+            return default
+        if idx < len(self.ids) and self.ids[idx] == key:
+            return idx
+        return default
+
+    def __getitem__(self, key):
+        idx = self.get(key)
+        if idx is None:
+            raise KeyError(key)
+        return idx
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from models.data.artifacts import load_array, publish, read_meta, save_arrays, staging_path, write_meta
+
+def _encode_column(column):
+    """(kind, arrays) for one column in its compact on-disk layout"""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return 'datetime', {'values': column.to_numpy(dtype='datetime64[ns]').view(np.int64)}
+
+    if pd.api.types.is_float_dtype(column):
+        return 'float32', {'values': column.to_numpy(dtype=np.float32)}
+
+    if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+        return 'numeric', {'values': column.to_numpy()}
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, categories = column.cat.codes.to_numpy(), column.cat.categories
+    else:
+        codes, categories = pd.factorize(column, sort=True)
+        # Mostly-unique columns (IDs, titles) gain nothing from a dictionary
+        if len(categories) > len(column) // 2:
+            return 'string', {'values': np.asarray(column).astype(str)}
+
+    # Store codes at the width pandas itself uses, so loading does not recast them
+    codes = pd.Categorical.from_codes(codes, categories=categories).codes
+    return 'category', {'codes': codes, 'categories': np.asarray(categories).astype(str)}
+
+def save_frame(path, frame):
+    """
+    Write a DataFrame to a directory of .npy columns.
+
+    Low-cardinality strings are dictionary-encoded (integer codes plus a
+    sorted category array), timestamps are int64 nanoseconds and floats are
+    float32, so every column can be memory-mapped back without parsing.
+    """
+    tmp_path = staging_path(path)
+    columns = []
+    for name in frame.columns:
+        kind, arrays = _encode_column(frame[name])
+        save_arrays(tmp_path, **{f'{name}.{part}': array for part, array in arrays.items()})
+        columns.append({'name': name, 'kind': kind})
+
+    write_meta(tmp_path, {'rows': len(frame), 'columns': columns})
+    publish(tmp_path, path)
+
+def load_frame(path, mmap_mode='r'):
+    """
+    Load a frame written by save_frame().
+
+    Numeric, datetime and categorical-code columns are views over
+    memory-mapped files, so processes loading the same directory share one
+    copy through the page cache. Plain string columns are materialized.
+    """
+    meta = read_meta(path)
+    data = {}
+    for column in meta['columns']:
+        name, kind = column['name'], column['kind']
+        if kind == 'category':
+            categories = pd.Index(load_array(path, f'{name}.categories', mmap_mode=None).astype(object))
+            data[name] = pd.Categorical.from_codes(load_array(path, f'{name}.codes', mmap_mode), categories=categories)
+        elif kind == 'datetime':
+            data[name] = load_array(path, f'{name}.values', mmap_mode).view('datetime64[ns]')
+        elif kind == 'string':
+            data[name] = load_array(path, f'{name}.values', mmap_mode=None).astype(object)
+        else:
+            data[name] = load_array(path, f'{name}.values', mmap_mode)
+
+    return pd.DataFrame(data, copy=False)
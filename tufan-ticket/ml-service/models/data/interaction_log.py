@@ -0,0 +1,242 @@
+import os
+import numpy as np
+import pandas as pd
+from models.data.artifacts import has_artifact, load_array, publish, read_meta, save_arrays, staging_path, write_meta
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional Parquet ingest
+    pq = None
+
+KEY_COLUMNS = ('user_id', 'event_id', 'interaction_type')
+CODE_DTYPES = {'user_id': np.int32, 'event_id': np.int32, 'interaction_type': np.int8}
+DICTIONARY_DIR = 'dictionaries'
+PERIOD_PREFIX = 'period='
+
+def _recode(local_codes, uniques, dictionary):
+    """
+    Map codes over a batch-local set of values to codes over the dictionary.
+    Missing values keep the code -1 rather than taking another value's.
+    """
+    positions = dictionary.get_indexer(uniques)
+    unseen = positions < 0
+    if unseen.any():
+        positions[unseen] = np.arange(len(dictionary), len(dictionary) + unseen.sum())
+        dictionary = dictionary.append(pd.Index(uniques[unseen], dtype=object))
+
+    return np.where(local_codes < 0, -1, positions[local_codes]), dictionary
+
+def _sorted_categorical(codes, dictionary):
+    """
+    A Categorical with categories in sorted order. The dictionaries are in
+    insertion order, and consumers (InteractionStore, and through it the
+    models' sorted ID arrays) take a categorical's order to be its values'.
+    """
+    order = dictionary.argsort()
+    if (order == np.arange(len(order))).all():
+        return pd.Categorical.from_codes(codes, categories=dictionary)
+
+    rank = np.empty(len(order), dtype=codes.dtype)
+    rank[order] = np.arange(len(order))
+    return pd.Categorical.from_codes(rank[codes], categories=dictionary[order])
+
+class InteractionLog:
+    """
+    Append-only interaction log stored as time-partitioned columnar files.
+
+    user_id, event_id and interaction_type are dictionary-encoded against
+    log-wide dictionaries, so partitions hold only integer codes and int64
+    timestamps. Each partition covers one period (a day by default), so
+    reading a recent window opens only the partitions it overlaps, and
+    every column is memory-mapped rather than parsed.
+
+    Layout:
+        <path>/meta.json
+        <path>/dictionaries/{user_id,event_id,interaction_type}.npy
+        <path>/period=2024-05-01/part-00000/{...codes, timestamp}.npy
+    """
+
+    def __init__(self, path, partition_unit='D'):
+        self.path = path
+        self.partition_unit = partition_unit
+        if has_artifact(path):
+            self.partition_unit = read_meta(path)['partition_unit']
+
+    def dictionaries(self):
+        """Log-wide value arrays for each dictionary-encoded column"""
+        dictionary_path = os.path.join(self.path, DICTIONARY_DIR)
+        if not has_artifact(dictionary_path):
+            return {key: pd.Index([], dtype=object) for key in KEY_COLUMNS}
+
+        return {
+            key: pd.Index(load_array(dictionary_path, key, mmap_mode=None).astype(object))
+            for key in KEY_COLUMNS
+        }
+
+    def periods(self):
+        """Partition periods present in the log, oldest first"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name[len(PERIOD_PREFIX):] for name in os.listdir(self.path)
+            if name.startswith(PERIOD_PREFIX)
+        )
+
+    def empty(self):
+        return not self.periods()
+
+    def append(self, interactions_df, dictionaries=None):
+        """
+        Encode a batch of interactions and write it into its time partitions.
+
+        Returns the updated dictionaries, which bulk loads pass back in to
+        avoid re-reading them for every batch.
+        """
+        if dictionaries is None:
+            dictionaries = self.dictionaries()
+        if interactions_df.empty:
+            return dictionaries
+
+        # factorize works on the codes of categorical columns without touching the strings
+        codes = {key: pd.factorize(interactions_df[key]) for key in KEY_COLUMNS}
+        timestamps = interactions_df['timestamp'].to_numpy(dtype='datetime64[ns]')
+
+        return self._append_encoded(codes, timestamps, dictionaries)
+
+    def append_parquet(self, source, batch_size=1000000):
+        """Ingest interactions from a Parquet file, one record batch at a time"""
+        if pq is None:
+            raise ImportError('pyarrow is required to ingest Parquet files')
+
+        # Read ID columns as Arrow dictionary arrays and recode their indices
+        # directly, without materializing strings per row
+        parquet_file = pq.ParquetFile(source, read_dictionary=list(KEY_COLUMNS))
+        dictionaries = self.dictionaries()
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=[*KEY_COLUMNS, 'timestamp']):
+            codes = {}
+            for key in KEY_COLUMNS:
+                column = batch.column(key)
+                codes[key] = (
+                    # Nulls take the code -1, as pd.factorize gives missing values
+                    column.indices.fill_null(-1).to_numpy(zero_copy_only=False),
+                    column.dictionary.to_numpy(zero_copy_only=False)
+                )
+            timestamps = batch.column('timestamp').cast('timestamp[ns]').to_numpy(zero_copy_only=False)
+            dictionaries = self._append_encoded(codes, timestamps, dictionaries)
+
+    def _append_encoded(self, codes, timestamps, dictionaries):
+        """
+        Write a batch given as (local codes, local values) per key column and
+        datetime64 timestamps, extending the dictionaries with unseen values.
+        Rows missing a user, event or interaction type can't be credited to
+        anything and are dropped.
+        """
+        dictionaries = dict(dictionaries)
+        changed = False
+        for key in KEY_COLUMNS:
+            size = len(dictionaries[key])
+            local_codes, uniques = codes[key]
+            key_codes, dictionaries[key] = _recode(local_codes, np.asarray(uniques, dtype=object), dictionaries[key])
+            codes[key] = key_codes.astype(CODE_DTYPES[key])
+            changed |= len(dictionaries[key]) != size
+
+        valid = np.logical_and.reduce([key_codes >= 0 for key_codes in codes.values()])
+        if not valid.all():
+            codes = {key: key_codes[valid] for key, key_codes in codes.items()}
+            timestamps = timestamps[valid]
+
+        # Dictionaries go first, so readers never see codes they cannot decode
+        if not has_artifact(self.path):
+            write_meta(self.path, {'partition_unit': self.partition_unit})
+        if changed:
+            self._write_dictionaries(dictionaries)
+
+        # Group rows by period with one sort, then write each period's slice
+        periods, period_codes = np.unique(timestamps.astype(f'datetime64[{self.partition_unit}]'), return_inverse=True)
+        order = np.argsort(period_codes, kind='stable')
+        offsets = np.zeros(len(periods) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(period_codes, minlength=len(periods)), out=offsets[1:])
+
+        for i, period in enumerate(periods):
+            rows = order[offsets[i]:offsets[i + 1]]
+            self._write_part(
+                np.datetime_as_string(period),
+                timestamp=timestamps[rows].view(np.int64),
+                **{key: key_codes[rows] for key, key_codes in codes.items()}
+            )
+
+        return dictionaries
+
+    def read(self, start=None, end=None, mmap_mode='r'):
+        """
+        Interactions with start <= timestamp < end as a DataFrame.
+
+        Only partitions overlapping the window are opened. ID columns come
+        back as categoricals over the sorted log dictionaries; with a single
+        partition, no boundary filtering and dictionaries whose insertion
+        order is already sorted, columns are views over the memory-mapped
+        files.
+        """
+        start = None if start is None else np.datetime64(start, 'ns')
+        end = None if end is None else np.datetime64(end, 'ns')
+        unit = np.timedelta64(1, self.partition_unit)
+
+        parts = []
+        for period in self.periods():
+            period_start = np.datetime64(period, self.partition_unit)
+            if start is not None and period_start + unit <= start:
+                continue
+            if end is not None and period_start >= end:
+                continue
+            period_path = os.path.join(self.path, PERIOD_PREFIX + period)
+            parts.extend(os.path.join(period_path, name) for name in self._part_names(period_path))
+
+        # Read after listing partitions, so the dictionaries cover every code
+        dictionaries = self.dictionaries()
+
+        columns = {}
+        for name, dtype in [*CODE_DTYPES.items(), ('timestamp', np.int64)]:
+            arrays = [load_array(part, name, mmap_mode) for part in parts]
+            if not arrays:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+        # Partitions at the window edges can hold rows outside it
+        timestamps = columns['timestamp'].view('datetime64[ns]')
+        if parts and (start is not None or end is not None):
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps < end
+            if not mask.all():
+                columns = {name: values[mask] for name, values in columns.items()}
+                timestamps = columns['timestamp'].view('datetime64[ns]')
+
+        data = {key: _sorted_categorical(columns[key], dictionaries[key]) for key in KEY_COLUMNS}
+        data['timestamp'] = timestamps
+
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def _part_names(period_path):
+        """Published parts of a period, skipping any still being staged"""
+        return sorted(name for name in os.listdir(period_path) if name[len('part-'):].isdigit())
+
+    def _write_dictionaries(self, dictionaries):
+        path = os.path.join(self.path, DICTIONARY_DIR)
+        tmp_path = staging_path(path)
+        save_arrays(tmp_path, **{key: np.asarray(values).astype(str) for key, values in dictionaries.items()})
+        write_meta(tmp_path, {key: len(values) for key, values in dictionaries.items()})
+        publish(tmp_path, path)
+
+    def _write_part(self, period, **columns):
+        period_path = os.path.join(self.path, PERIOD_PREFIX + period)
+        os.makedirs(period_path, exist_ok=True)
+        path = os.path.join(period_path, f'part-{len(self._part_names(period_path)):05d}')
+
+        tmp_path = staging_path(path)
+        save_arrays(tmp_path, **columns)
+        write_meta(tmp_path, {'rows': len(columns['timestamp'])})
+        publish(tmp_path, path)
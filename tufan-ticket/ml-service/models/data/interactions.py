@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+class InteractionStore:
+    """Interaction log grouped by user and by event for O(1) per-key lookups"""
+
+    def __init__(self, interactions_df):
+        self.interactions = interactions_df
+
+        # Encode keys as sorted categorical codes
+        user_codes, user_ids = pd.factorize(interactions_df['user_id'], sort=True)
+        event_codes, event_ids = pd.factorize(interactions_df['event_id'], sort=True)
+
+        self.user_ids = np.asarray(user_ids)
+        self.event_ids = np.asarray(event_ids)
+        self.user_codes = user_codes.astype(np.int32)
+        self.event_codes = event_codes.astype(np.int32)
+        # Interaction types as small codes and timestamps as datetime64 for vectorized scoring
+        type_codes, interaction_types = pd.factorize(interactions_df['interaction_type'])
+        self.type_codes = type_codes.astype(np.int8)
+        self.interaction_types = np.asarray(interaction_types)
+        self.timestamps = interactions_df['timestamp'].to_numpy(dtype='datetime64[ns]')
+
+        self.user_lookup = dict(zip(self.user_ids, range(len(self.user_ids))))
+        self.event_lookup = dict(zip(self.event_ids, range(len(self.event_ids))))
+
+        # Row positions sorted by key, plus offsets delimiting each key's run
+        self._user_order, self._user_offsets = self._group(self.user_codes, len(self.user_ids))
+        self._event_order, self._event_offsets = self._group(self.event_codes, len(self.event_ids))
+
+    @staticmethod
+    def _group(codes, n_keys):
+        """Stable sort of row positions by code and the CSR-style offsets array"""
+        order = np.argsort(codes, kind='stable')
+        offsets = np.zeros(n_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=n_keys), out=offsets[1:])
+        return order, offsets
+
+    def type_values(self, mapping, default=0.0, positions=None):
+        """Per-row values looked up by interaction type through a small table, optionally for some rows only"""
+        table = np.array([mapping.get(t, default) for t in self.interaction_types] + [default], dtype=np.float64)
+        type_codes = self.type_codes if positions is None else self.type_codes[positions]
+        # Missing types are coded -1, which indexes the trailing default
+        return table[type_codes]
+
+    def __len__(self):
+        return len(self.interactions)
+
+    def has_user(self, user_id):
+        return user_id in self.user_lookup
+
+    def has_event(self, event_id):
+        return event_id in self.event_lookup
+
+    def user_positions(self, user_id):
+        """Row positions of a user's interactions (in log order)"""
+        code = self.user_lookup.get(user_id)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._user_order[self._user_offsets[code]:self._user_offsets[code + 1]]
+
+    def event_positions(self, event_id):
+        """Row positions of an event's interactions (in log order)"""
+        code = self.event_lookup.get(event_id)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._event_order[self._event_offsets[code]:self._event_offsets[code + 1]]
+
+    def user_interactions(self, user_id):
+        """Interactions for a single user as a DataFrame"""
+        return self.interactions.iloc[self.user_positions(user_id)]
+
+    def event_interactions(self, event_id):
+        """Interactions for a single event as a DataFrame"""
+        return self.interactions.iloc[self.event_positions(event_id)]
+
+    def user_event_ids(self, user_id):
+        """Distinct event IDs a user has interacted with"""
+        codes = np.unique(self.event_codes[self.user_positions(user_id)])
+        return self.event_ids[codes]
+
+    def user_counts(self):
+        """Number of interactions per user, indexed by user ID"""
+        return pd.Series(np.diff(self._user_offsets), index=self.user_ids)
+
+    def event_counts(self):
+        """Number of interactions per event, indexed by event ID"""
+        return pd.Series(np.diff(self._event_offsets), index=self.event_ids)
+
+
+_cached_store = None
+
+def get_interaction_store(interactions_df):
+    """
+    Return the InteractionStore for a DataFrame, building it once.
+
+    The store is cached against the DataFrame object and its length, so
+    appending rows triggers a rebuild; in-place edits of existing rows do not.
+    """
+    global _cached_store
+
+    store = _cached_store
+    if store is None or store.interactions is not interactions_df or len(store) != len(interactions_df):
+        store = InteractionStore(interactions_df)
+        _cached_store = store
+
+    return store
@@ -0,0 +1,93 @@
+import collections
+import os
+import re
+import sys
+import threading
+import time
+
+class SamplingProfiler:
+    """
+    Opt-in sampling profiler for slow requests.
+
+    Requests being profiled register their thread; one background thread
+    samples those threads' Python stacks every interval_ms. When a request
+    takes at least slow_ms, its samples are written to output_dir in the
+    collapsed-stack format ("root;caller;callee count" per line), which
+    flamegraph.pl, speedscope and similar tools read directly. Faster
+    requests discard their samples.
+    """
+
+    def __init__(self, output_dir, slow_ms=500, interval_ms=5):
+        self.output_dir = output_dir
+        self.slow = slow_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+
+    def _after_fork(self):
+        # The sampler thread (and any lock it held) doesn't survive fork;
+        # a forked worker starts its own on its first profiled request
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+
+    def start(self):
+        """Begin sampling the calling thread; pass the returned token to stop()"""
+        self._ensure_started()
+        thread_id = threading.get_ident()
+        samples = collections.Counter()
+        with self._lock:
+            self._active[thread_id] = samples
+        return thread_id, samples, time.perf_counter()
+
+    def stop(self, token, label):
+        """Stop sampling; returns the profile path if the request was slow, else None"""
+        thread_id, samples, start = token
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._active.pop(thread_id, None)
+            samples = collections.Counter(samples)
+
+        if elapsed < self.slow or not samples:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'request'
+        path = os.path.join(self.output_dir, f'{time.strftime("%Y%m%dT%H%M%S")}-{name}-{elapsed * 1000:.0f}ms.folded')
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+        return path
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+def _collapse(frame):
+    """A frame's stack as 'outermost;...;innermost'"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -1,108 +1,286 @@
 import numpy as np
-import pandas as pd
-from sklearn.decomposition import NMF
-from sklearn.preprocessing import normalize
+import scipy.sparse as sp
+from models.data.artifacts import (
+    SortedIdMapping, id_array, load_array, publish, read_meta, save_arrays, staging_path, write_meta
+)
+from models.data.interactions import get_interaction_store
+from models.metrics import timed
+from models.recommendation.vector_index import make_index
 
 class CollaborativeFilteringModel:
-    def __init__(self, n_factors=20):
+    def __init__(self, n_factors=20, index='exact', index_params=None, warm_start_iter=20):
         self.n_factors = n_factors
-        self.model = NMF(n_components=n_factors, init='random', random_state=42)
+        self.warm_start_iter = warm_start_iter
+        self.index = index
+        self.index_params = index_params or {}
+        self.item_index = None
+        # NMF is created on fit, keeping sklearn out of import time
+        self.model = None
         self.user_factors = None
         self.item_factors = None
-        self.user_mapping = {}
-        self.item_mapping = {}
-        self.reverse_user_mapping = {}
-        self.reverse_item_mapping = {}
+        self.user_mapping = SortedIdMapping(id_array([]))
+        self.item_mapping = SortedIdMapping(id_array([]))
+        self.user_ids = None
+        self.item_ids = None
+        # Factors of users folded in since the last fit, by user ID
+        self.folded_factors = {}
+        self._item_lookup = None
+        self.weight_map = {'view': 1, 'click': 3, 'purchase': 10}
     
     def _create_user_item_matrix(self, interactions_df):
-        # Create user-item interaction matrix with implicit feedback
+        # Create a sparse user-item interaction matrix with implicit feedback
         # Weight different interaction types: purchase > click > view
-        weighted_interactions = interactions_df.copy()
-        weight_map = {'view': 1, 'click': 3, 'purchase': 10}
-        weighted_interactions['weight'] = weighted_interactions['interaction_type'].map(weight_map)
+        store = get_interaction_store(interactions_df)
+        weights = store.type_values(self.weight_map, default=np.nan)
+
+        # Users and items are the store's sorted categorical codes
+        user_codes, item_codes = store.user_codes, store.event_codes
+
+        # Create mappings
+        self.user_ids = id_array(store.user_ids)
+        self.item_ids = id_array(store.event_ids)
+        self.user_mapping = SortedIdMapping(self.user_ids)
+        self.item_mapping = SortedIdMapping(self.item_ids)
+
+        # Build the matrix in COO form; duplicate (user, item) pairs are summed
+        # when converting to CSR, which aggregates repeated interactions
+        matrix = sp.coo_matrix(
+            (weights, (user_codes, item_codes)),
+            shape=(len(self.user_ids), len(self.item_ids))
+        ).tocsr()
+        matrix.sum_duplicates()
+
+        # Log-transform interactions to dampen the effect of very popular items
+        matrix.data = np.log1p(matrix.data)
+
+        return matrix
+    
+    def fit(self, interactions_df, warm_start=False):
+        """
+        Train the collaborative filtering model using NMF.
         
-        # Aggregate interactions by user and item
-        user_item_df = weighted_interactions.groupby(['user_id', 'event_id'])['weight'].sum().reset_index()
+        With warm_start, NMF starts from the current factors instead of a
+        random init: known users and items keep their vectors, new items
+        start at the mean item vector and new users are folded in against
+        those item factors. Starting this close to the optimum, a few
+        iterations (warm_start_iter) match a full cold fit's loss.
+        """
+        from sklearn.decomposition import NMF
         
-        # Create mappings
-        unique_users = user_item_df['user_id'].unique()
-        unique_items = user_item_df['event_id'].unique()
+        previous = self._user_factor_table() if warm_start and self.item_factors is not None else None
+        previous_items = (self.item_ids, self.item_factors)
         
-        self.user_mapping = {user: i for i, user in enumerate(unique_users)}
-        self.item_mapping = {item: i for i, item in enumerate(unique_items)}
-        self.reverse_user_mapping = {i: user for user, i in self.user_mapping.items()}
-        self.reverse_item_mapping = {i: item for item, i in self.item_mapping.items()}
+        user_item_matrix = self._create_user_item_matrix(interactions_df)
         
-        # Create sparse matrix
-        rows = user_item_df['user_id'].map(self.user_mapping)
-        cols = user_item_df['event_id'].map(self.item_mapping)
-        data = user_item_df['weight']
+        # Fit NMF model directly on the sparse matrix
+        if previous is None:
+            self.model = NMF(n_components=self.n_factors, init='random', random_state=42)
+            self.user_factors = self.model.fit_transform(user_item_matrix)
+        else:
+            item_factors = self._align_item_factors(*previous_items)
+            user_factors = self._align_user_factors(*previous, item_factors, user_item_matrix)
+            self.model = NMF(
+                n_components=self.n_factors, init='custom', max_iter=self.warm_start_iter, random_state=42
+            )
+            self.user_factors = self.model.fit_transform(
+                user_item_matrix, W=user_factors, H=np.ascontiguousarray(item_factors.T)
+            )
+        self.item_factors = self.model.components_.T
+        self.folded_factors = {}
         
-        # Create and normalize the matrix
-        matrix = np.zeros((len(unique_users), len(unique_items)))
-        for i, (r, c, d) in enumerate(zip(rows, cols, data)):
-            matrix[r, c] = d
+        # Index item factors for top-K inner-product search
+        self.item_index = make_index(self.index, **self.index_params).build(self.item_factors)
         
-        # Log-transform interactions to dampen the effect of very popular items
-        matrix = np.log1p(matrix)
+        return self
+    
+    @timed('collaborative.fold_in')
+    def fold_in(self, user_ids, interactions_df):
+        """
+        Fit factor vectors for new or changed users without refitting NMF.
+        
+        Each user's weighted interaction row is projected onto the fixed
+        item factors by non-negative least squares. Users already in the
+        fitted model are updated in place; new users are kept in
+        folded_factors until the next fit or save.
+        """
+        user_ids = list(user_ids)
+        rows = self._interaction_rows(user_ids, interactions_df)
+        user_factors = _solve_user_factors(self.item_factors, rows)
+        
+        for user_id, vector, n_items in zip(user_ids, user_factors, np.diff(rows.indptr)):
+            if n_items == 0:
+                # No interactions with items the model knows about
+                continue
+            
+            user_idx = self.user_mapping.get(user_id)
+            if user_idx is None:
+                self.folded_factors[user_id] = vector
+            else:
+                # Memory-mapped factors are read-only; copy before the first update
+                if not self.user_factors.flags.writeable:
+                    self.user_factors = np.array(self.user_factors)
+                self.user_factors[user_idx] = vector
+        
+        return self
+    
+    def _interaction_rows(self, user_ids, interactions_df):
+        """Log-weighted interaction rows of the given users over the model's items, as CSR"""
+        store = get_interaction_store(interactions_df)
+        item_of_code = self._item_of_code(store)
+        
+        row_positions = [store.user_positions(user_id) for user_id in user_ids]
+        rows = np.repeat(np.arange(len(user_ids)), [len(p) for p in row_positions])
+        positions = np.concatenate(row_positions) if row_positions else np.empty(0, dtype=np.int64)
+        items = item_of_code[store.event_codes[positions]]
+        known = items >= 0
+        
+        matrix = sp.coo_matrix(
+            (store.type_values(self.weight_map, positions=positions)[known], (rows[known], items[known])),
+            shape=(len(user_ids), len(self.item_ids))
+        ).tocsr()
+        matrix.sum_duplicates()
+        matrix.data = np.log1p(matrix.data)
         
         return matrix
     
-    def fit(self, interactions_df):
-        """Train the collaborative filtering model using NMF"""
-        user_item_matrix = self._create_user_item_matrix(interactions_df)
+    def _item_of_code(self, store):
+        """Model item index of every event code in the store (-1 if unknown to the model)"""
+        cached = self._item_lookup
+        if cached is not None and cached[0] is store and cached[1] is self.item_ids:
+            return cached[2]
         
-        # Fit NMF model
-        self.user_factors = self.model.fit_transform(user_item_matrix)
-        self.item_factors = self.model.components_.T
+        event_ids = id_array(store.event_ids)
+        positions = np.minimum(np.searchsorted(self.item_ids, event_ids), len(self.item_ids) - 1)
+        item_of_code = np.where(self.item_ids[positions] == event_ids, positions, -1)
+        self._item_lookup = (store, self.item_ids, item_of_code)
+        
+        return item_of_code
+    
+    def _user_factor_table(self):
+        """Fitted and folded-in user factors as (sorted user IDs, factor rows)"""
+        if not self.folded_factors:
+            return self.user_ids, self.user_factors
+        
+        user_ids = np.concatenate([self.user_ids, id_array(list(self.folded_factors))])
+        user_factors = np.vstack([self.user_factors, np.array(list(self.folded_factors.values()))])
+        order = np.argsort(user_ids, kind='stable')
+        
+        return user_ids[order], user_factors[order]
+    
+    def _align_item_factors(self, previous_ids, previous_factors):
+        """Previous item factors laid out for the current items; new items get the mean vector"""
+        positions = np.minimum(np.searchsorted(previous_ids, self.item_ids), len(previous_ids) - 1)
+        known = previous_ids[positions] == self.item_ids
+        
+        item_factors = np.tile(np.asarray(previous_factors).mean(axis=0), (len(self.item_ids), 1))
+        item_factors[known] = previous_factors[positions[known]]
+        
+        return item_factors
+    
+    def _align_user_factors(self, previous_ids, previous_factors, item_factors, user_item_matrix):
+        """Previous user factors laid out for the current users; new users are folded in"""
+        positions = np.minimum(np.searchsorted(previous_ids, self.user_ids), len(previous_ids) - 1)
+        known = previous_ids[positions] == self.user_ids
+        
+        user_factors = np.zeros((len(self.user_ids), self.n_factors))
+        user_factors[known] = previous_factors[positions[known]]
+        new_users = np.flatnonzero(~known)
+        user_factors[new_users] = _solve_user_factors(item_factors, user_item_matrix[new_users])
+        
+        return user_factors
+    
+    def save(self, path):
+        """Persist fitted factors, ID mappings and the item index to a directory"""
+        tmp_path = staging_path(path)
+        user_ids, user_factors = self._user_factor_table()
+        save_arrays(
+            tmp_path,
+            user_factors=user_factors,
+            item_factors=self.item_factors,
+            user_ids=user_ids,
+            item_ids=self.item_ids
+        )
+        self.item_index.save(tmp_path)
+        write_meta(tmp_path, {
+            'n_factors': self.n_factors,
+            'warm_start_iter': self.warm_start_iter,
+            'index': self.index,
+            'index_params': self.index_params
+        })
+        publish(tmp_path, path)
         
         return self
     
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a fitted model saved with save(), memory-mapping the factor matrices"""
+        meta = read_meta(path)
+        model = cls(
+            n_factors=meta['n_factors'],
+            index=meta['index'],
+            index_params=meta['index_params'],
+            warm_start_iter=meta.get('warm_start_iter', 20)
+        )
+        
+        model.user_factors = load_array(path, 'user_factors', mmap_mode)
+        model.item_factors = load_array(path, 'item_factors', mmap_mode)
+        model.user_ids = load_array(path, 'user_ids', mmap_mode)
+        model.item_ids = load_array(path, 'item_ids', mmap_mode)
+        model.user_mapping = SortedIdMapping(model.user_ids)
+        model.item_mapping = SortedIdMapping(model.item_ids)
+        model.item_index = make_index(model.index, **model.index_params).restore(
+            path, model.item_factors, mmap_mode
+        )
+        
+        return model
+    
     def get_user_recommendations(self, user_id, interactions_df, top_n=10, exclude_seen=True):
         """Get top N recommendations for a specific user"""
         # Check if model is fitted
         if self.user_factors is None:
             self.fit(interactions_df)
         
-        # Check if user exists in training data
-        if user_id not in self.user_mapping:
+        user_vector = self._user_vector(user_id)
+        if user_vector is None and get_interaction_store(interactions_df).has_user(user_id):
+            # User with history but no factors yet: fold them in against the item factors
+            self.fold_in([user_id], interactions_df)
+            user_vector = self._user_vector(user_id)
+        
+        if user_vector is None:
             # Cold start - return popular items
             return self._get_popular_items(interactions_df, top_n)
         
-        user_idx = self.user_mapping[user_id]
-        user_vector = self.user_factors[user_idx].reshape(1, -1)
-        
-        # Calculate predicted ratings
-        pred_ratings = np.dot(user_vector, self.item_factors.T).flatten()
-        
-        # Get indices of top N items
+        seen_indices = None
         if exclude_seen:
             # Get items the user has already interacted with
-            seen_items = interactions_df[interactions_df['user_id'] == user_id]['event_id'].unique()
+            seen_items = get_interaction_store(interactions_df).user_event_ids(user_id)
             seen_indices = [self.item_mapping[item] for item in seen_items if item in self.item_mapping]
-            
-            # Set ratings of seen items to negative infinity
-            pred_ratings[seen_indices] = float('-inf')
         
-        top_item_indices = np.argsort(pred_ratings)[::-1][:top_n]
+        # Get indices of top N items by predicted rating, skipping seen items
+        top_item_indices, _ = self.item_index.search(user_vector, top_n, exclude=seen_indices)
         
         # Convert back to event IDs
-        top_items = [self.reverse_item_mapping[idx] for idx in top_item_indices]
+        top_items = self.item_ids[top_item_indices].tolist()
         
         return top_items
     
+    def _user_vector(self, user_id):
+        """Factor vector of a fitted or folded-in user, or None"""
+        user_idx = self.user_mapping.get(user_id)
+        if user_idx is not None:
+            return self.user_factors[user_idx]
+        return self.folded_factors.get(user_id)
+    
     def _get_popular_items(self, interactions_df, top_n=10):
         """Get most popular items based on interaction counts"""
         # Weight purchases more heavily
-        weighted_interactions = interactions_df.copy()
-        weight_map = {'view': 1, 'click': 3, 'purchase': 10}
-        weighted_interactions['weight'] = weighted_interactions['interaction_type'].map(weight_map)
-        
+        store = get_interaction_store(interactions_df)
+        weights = np.bincount(store.event_codes, weights=store.type_values(self.weight_map), minlength=len(store.event_ids))
+
         # Get popularity scores
-        popularity = weighted_interactions.groupby('event_id')['weight'].sum().reset_index()
-        popularity = popularity.sort_values('weight', ascending=False).head(top_n)
-        
-        return popularity['event_id'].tolist()
+        top_codes = np.argsort(-weights, kind='stable')[:top_n]
+
+        return store.event_ids[top_codes].tolist()
     
     def get_recommendations(self, user_id, interactions_df, events_df, limit=10):
         """Get recommendations and join with events data"""
@@ -115,13 +293,39 @@ class CollaborativeFilteringModel:
         )
         
         # Filter events dataframe to recommended events
-        recommended_events = events_df[events_df['event_id'].isin(rec_event_ids)].copy()
+        recommended_events = events_df[events_df['event_id'].isin(rec_event_ids)]
         
         # Add a score/rank column based on the order of recommendations
         rec_ranks = {event_id: rank for rank, event_id in enumerate(rec_event_ids)}
-        recommended_events['rec_score'] = recommended_events['event_id'].map(rec_ranks)
+        recommended_events = recommended_events.assign(rec_score=recommended_events['event_id'].map(rec_ranks))
         
         # Sort by recommendation score
         recommended_events = recommended_events.sort_values('rec_score')
         
-        return recommended_events
\ No newline at end of file
+        return recommended_events
+
+
+def _solve_user_factors(item_factors, rows):
+    """
+    Non-negative least-squares user factors for CSR interaction rows.
+    
+    min ||A w - r|| over w >= 0, with A the item factors, has the same
+    solution as min ||L^T w - L^-1 A^T r|| where L L^T = A^T A. That turns
+    every user's problem into a small n_factors x n_factors NNLS, and A^T r
+    only touches the items the user interacted with.
+    """
+    from scipy.linalg import solve_triangular
+    from scipy.optimize import nnls
+    
+    item_factors = np.asarray(item_factors, dtype=np.float64)
+    gram = item_factors.T @ item_factors
+    # A tiny ridge keeps the factorization defined when a component is unused
+    gram[np.diag_indices_from(gram)] += 1e-10 * max(np.trace(gram), 1.0)
+    lower = np.linalg.cholesky(gram)
+    
+    targets = solve_triangular(lower, np.asarray(rows @ item_factors).T, lower=True).T
+    user_factors = np.zeros((rows.shape[0], item_factors.shape[1]))
+    for i in np.flatnonzero(np.diff(rows.indptr)):
+        user_factors[i], _ = nnls(lower.T, targets[i])
+    
+    return user_factors
@@ -1,18 +1,25 @@
+import os
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from models.data.artifacts import (
+    id_array, load_array, publish, read_meta, save_arrays, staging_path, write_meta
+)
+from models.data.interactions import get_interaction_store
+from models.recommendation.vector_index import make_index
 
 class ContentBasedRecommender:
-    def __init__(self):
-        self.tfidf_vectorizer = TfidfVectorizer(
-            stop_words='english',
-            min_df=2,
-            max_features=5000,
-            ngram_range=(1, 2)
-        )
+    def __init__(self, index='exact', index_params=None):
+        # The vectorizer is created on fit, keeping sklearn out of import time
+        self.tfidf_vectorizer = None
+        self.index = index
+        self.index_params = index_params or {}
+        self.item_index = None
         self.item_features = None
         self.event_ids = None
+        self.event_index = {}
+        self.weight_map = {'view': 1, 'click': 3, 'purchase': 10}
     
     def fit(self, events_df):
         """Generate item features based on event metadata"""
@@ -22,12 +29,70 @@ class ContentBasedRecommender:
             axis=1
         )
         
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
         # Generate TF-IDF features
+        self.tfidf_vectorizer = TfidfVectorizer(
+            stop_words='english',
+            min_df=2,
+            max_features=5000,
+            ngram_range=(1, 2)
+        )
         self.item_features = self.tfidf_vectorizer.fit_transform(events_df['features_text'])
         self.event_ids = events_df['event_id'].tolist()
+        self.event_index = dict(zip(self.event_ids, range(len(self.event_ids))))
+        
+        # Index TF-IDF rows; they are L2-normalized, so inner product is cosine similarity
+        self.item_index = make_index(self.index, **self.index_params).build(self.item_features)
+        
+        return self
+    
+    def save(self, path):
+        """Persist the fitted vectorizer, TF-IDF matrix and event IDs to a directory"""
+        tmp_path = staging_path(path)
+        features = self.item_features.tocsr()
+        save_arrays(
+            tmp_path,
+            features_data=features.data,
+            features_indices=features.indices,
+            features_indptr=features.indptr,
+            event_ids=id_array(self.event_ids)
+        )
+        self.item_index.save(tmp_path)
+        joblib.dump(self.tfidf_vectorizer, os.path.join(tmp_path, 'vectorizer.joblib'))
+        write_meta(tmp_path, {
+            'shape': list(features.shape),
+            'index': self.index,
+            'index_params': self.index_params
+        })
+        publish(tmp_path, path)
         
         return self
     
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a fitted model saved with save(), memory-mapping the TF-IDF arrays"""
+        meta = read_meta(path)
+        model = cls(index=meta['index'], index_params=meta['index_params'])
+        
+        model.tfidf_vectorizer = joblib.load(os.path.join(path, 'vectorizer.joblib'))
+        model.item_features = sp.csr_matrix(
+            (
+                load_array(path, 'features_data', mmap_mode),
+                load_array(path, 'features_indices', mmap_mode),
+                load_array(path, 'features_indptr', mmap_mode)
+            ),
+            shape=tuple(meta['shape']),
+            copy=False
+        )
+        model.event_ids = load_array(path, 'event_ids', mmap_mode).tolist()
+        model.event_index = dict(zip(model.event_ids, range(len(model.event_ids))))
+        model.item_index = make_index(model.index, **model.index_params).restore(
+            path, model.item_features, mmap_mode
+        )
+        
+        return model
+    
     def get_similar_items(self, item_id, events_df, top_n=10):
         """Get top N most similar items to a given item"""
         # Check if model is fitted
@@ -35,20 +100,16 @@ class ContentBasedRecommender:
             self.fit(events_df)
         
         # Find index of the item
-        try:
-            idx = self.event_ids.index(item_id)
-        except ValueError:
+        idx = self.event_index.get(item_id)
+        if idx is None:
             # Item not found in training data
             return []
         
         # Get the item's feature vector
         item_vector = self.item_features[idx]
         
-        # Calculate similarity with all items
-        similarities = cosine_similarity(item_vector, self.item_features).flatten()
-        
         # Get indices of top similar items (excluding itself)
-        similar_indices = np.argsort(similarities)[::-1][1:top_n+1]
+        similar_indices, _ = self.item_index.search(item_vector, top_n, exclude=[idx])
         
         # Convert indices to item IDs
         similar_items = [self.event_ids[idx] for idx in similar_indices]
@@ -58,17 +119,20 @@ class ContentBasedRecommender:
     def get_user_preferences(self, user_id, interactions_df, events_df):
         """Extract user preferences based on past interactions"""
         # Get user's interactions
-        user_interactions = interactions_df[interactions_df['user_id'] == user_id]
+        store = get_interaction_store(interactions_df)
+        positions = store.user_positions(user_id)
         
-        if user_interactions.empty:
+        if len(positions) == 0:
             return None
         
         # Weight different interaction types
-        weight_map = {'view': 1, 'click': 3, 'purchase': 10}
-        user_interactions['weight'] = user_interactions['interaction_type'].map(weight_map)
+        user_events = pd.DataFrame({
+            'event_id': store.event_ids[store.event_codes[positions]],
+            'weight': store.type_values(self.weight_map, default=np.nan)[positions]
+        })
         
         # Group by event and get total weight
-        user_events = user_interactions.groupby('event_id')['weight'].sum().reset_index()
+        user_events = user_events.groupby('event_id')['weight'].sum().reset_index()
         user_events = user_events.sort_values('weight', ascending=False)
         
         # Get the events the user has interacted with
@@ -76,45 +140,52 @@ class ContentBasedRecommender:
         
         return interacted_events
     
+    def _user_profile(self, user_id, interactions_df):
+        """Build a user's interaction-weighted TF-IDF profile and their seen item indices"""
+        store = get_interaction_store(interactions_df)
+        positions = store.user_positions(user_id)
+        
+        # Map interacted events to feature rows, dropping events unknown to the model
+        item_indices = pd.Series(store.event_ids[store.event_codes[positions]]).map(self.event_index)
+        weights = pd.Series(store.type_values(self.weight_map, default=np.nan)[positions])
+        known = item_indices.notna() & weights.notna()
+        if not known.any():
+            return None, None
+        
+        item_indices = item_indices[known].to_numpy(dtype=np.int64)
+        weights = weights[known].to_numpy(dtype=np.float64)
+        
+        # Aggregate weights per item, then combine the item vectors in one product
+        item_weights = np.bincount(item_indices, weights=weights, minlength=len(self.event_ids))
+        seen_indices = np.flatnonzero(item_weights)
+        profile = self.item_features[seen_indices].T @ item_weights[seen_indices]
+        
+        return profile, seen_indices
+    
     def get_recommendations(self, user_id, interactions_df, events_df, limit=10):
         """Get content-based recommendations for a user"""
-        # Get user's preferred events
-        user_events = self.get_user_preferences(user_id, interactions_df, events_df)
-        
-        if user_events is None or user_events.empty:
-            # No user history available - return popular items by category
-            return events_df.sample(min(limit, len(events_df)))
-        
         # Ensure model is fitted
         if self.item_features is None:
             self.fit(events_df)
         
-        # Get similar items for each of the user's interacted items
-        # Weight by interaction strength
-        similar_items = {}
-        for _, event in user_events.iterrows():
-            event_id = event['event_id']
-            event_similars = self.get_similar_items(event_id, events_df, top_n=limit)
-            
-            for similar_id in event_similars:
-                if similar_id not in similar_items:
-                    similar_items[similar_id] = 0
-                
-                # Increment score for this similar item
-                similar_items[similar_id] += 1
-        
-        # Sort by score
-        sorted_items = sorted(similar_items.items(), key=lambda x: x[1], reverse=True)
-        
-        # Get top recommendations
-        top_event_ids = [item[0] for item in sorted_items[:limit]]
+        # Build the user's weighted feature profile
+        profile, seen_indices = self._user_profile(user_id, interactions_df)
+        
+        if profile is None:
+            # No user history available - return popular items by category
+            return events_df.sample(min(limit, len(events_df)))
+        
+        # Score items against the profile (a weighted sum of cosine
+        # similarities to the user's items), skipping items already seen
+        top_indices, top_scores = self.item_index.search(profile, limit, exclude=seen_indices)
+        top_event_ids = [self.event_ids[idx] for idx in top_indices]
         
         # Filter to recommended events
-        recommended_events = events_df[events_df['event_id'].isin(top_event_ids)].copy()
+        recommended_events = events_df[events_df['event_id'].isin(top_event_ids)]
         
         # Add recommendation score
-        rec_scores = {event_id: score for event_id, score in sorted_items if event_id in top_event_ids}
-        recommended_events['rec_score'] = recommended_events['event_id'].map(rec_scores)
+        rec_scores = dict(zip(top_event_ids, top_scores))
+        recommended_events = recommended_events.assign(rec_score=recommended_events['event_id'].map(rec_scores))
         
         # Sort by recommendation score
         recommended_events = recommended_events.sort_values('rec_score', ascending=False)
@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+from models.data.interactions import get_interaction_store
+from models.metrics import stage
+from models.recommendation.materialized import MaterializedRecommendations
 
 class HybridRecommender:
     def __init__(self, collaborative_model, content_model, collab_weight=0.7):
@@ -7,25 +10,33 @@ class HybridRecommender:
         self.content_model = content_model
         self.collab_weight = collab_weight
         self.content_weight = 1 - collab_weight
+        self.materialized = None
     
     def get_recommendations(self, user_id, interactions_df, events_df, limit=10):
         """Get hybrid recommendations combining collaborative and content-based filtering"""
         # Get collaborative filtering recommendations
-        collab_recs = self.collaborative_model.get_recommendations(
-            user_id, 
-            interactions_df, 
-            events_df, 
-            limit=limit*2  # Get more recs to ensure enough diversity
-        )
+        with stage('hybrid.collaborative'):
+            collab_recs = self.collaborative_model.get_recommendations(
+                user_id, 
+                interactions_df, 
+                events_df, 
+                limit=limit*2  # Get more recs to ensure enough diversity
+            )
         
         # Get content-based recommendations
-        content_recs = self.content_model.get_recommendations(
-            user_id, 
-            interactions_df, 
-            events_df, 
-            limit=limit*2  # Get more recs to ensure enough diversity
-        )
-        
+        with stage('hybrid.content'):
+            content_recs = self.content_model.get_recommendations(
+                user_id, 
+                interactions_df, 
+                events_df, 
+                limit=limit*2  # Get more recs to ensure enough diversity
+            )
+        
+        with stage('hybrid.merge'):
+            return self._merge(collab_recs, content_recs, limit)
+    
+    def _merge(self, collab_recs, content_recs, limit):
+        """Weight, combine and deduplicate the two models' recommendations"""
         # If either model couldn't provide recommendations, use the other one
         if collab_recs.empty:
             return content_recs.head(limit)
@@ -62,10 +73,89 @@ class HybridRecommender:
         # Return top recommendations
         return combined_recs.head(limit)
     
+    def materialize(self, interactions_df, events_df, top_k=20, user_ids=None, path=None):
+        """Precompute top-K hybrid recommendations for all active users"""
+        store = MaterializedRecommendations(top_k=top_k)
+        store.catalog_size = len(events_df)
+        signatures = self._interaction_signatures(interactions_df)
+
+        if user_ids is None:
+            user_ids = signatures.index.tolist()
+
+        self._materialize_users(store, user_ids, interactions_df, events_df)
+        store.signatures = signatures
+
+        if path:
+            store.save(path)
+            store = MaterializedRecommendations.load(path)
+
+        self.materialized = store
+        return store
+
+    def refresh_materialized(self, interactions_df, events_df, path=None):
+        """Recompute stored recommendations only for users whose interactions changed"""
+        if self.materialized is None:
+            store = self.materialize(interactions_df, events_df, path=path)
+            return list(store.user_rows)
+
+        store = self.materialized
+        signatures = self._interaction_signatures(interactions_df)
+
+        # A user is stale if their interaction count or latest timestamp moved
+        previous = store.signatures.reindex(signatures.index)
+        changed = (previous['count'] != signatures['count']) | (previous['last'] != signatures['last'])
+        changed_users = signatures.index[changed.to_numpy()].tolist()
+
+        self._materialize_users(store, changed_users, interactions_df, events_df)
+        store.signatures = signatures
+
+        if path:
+            store.save(path)
+            store = MaterializedRecommendations.load(path)
+            self.materialized = store
+
+        return changed_users
+
+    def get_materialized_recommendations(self, user_id, events_df, limit=10):
+        """
+        Serve precomputed recommendations, or None if the user is not materialized.
+
+        weighted_score is normalized over the store's top_k rather than limit,
+        see MaterializedRecommendations.
+        """
+        store = self.materialized
+        if store is None or store.catalog_size != len(events_df):
+            return None
+
+        hit = store.get(user_id, limit)
+        if hit is None:
+            return None
+
+        positions, scores = hit
+        return events_df.iloc[positions].assign(weighted_score=scores)
+
+    def _materialize_users(self, store, user_ids, interactions_df, events_df):
+        """Run the live hybrid ranking for each user and write it into the store"""
+        event_positions = pd.Series(np.arange(len(events_df)), index=events_df['event_id'])
+        store.reserve(user_ids)
+
+        for user_id in user_ids:
+            recs = self.get_recommendations(user_id, interactions_df, events_df, limit=store.top_k)
+            recs = recs[recs['event_id'].isin(event_positions.index)]
+            positions = event_positions[recs['event_id']].to_numpy(dtype=np.int32)
+            # Single-model fallbacks carry no weighted score; keep their order only
+            scores = recs.get('weighted_score', pd.Series(0.0, index=recs.index))
+            store.put(user_id, positions, scores.to_numpy(dtype=np.float32))
+
+    def _interaction_signatures(self, interactions_df):
+        """Per-user interaction count and latest timestamp, used to detect changes"""
+        grouped = interactions_df.groupby('user_id', observed=True)['timestamp']
+        return pd.DataFrame({'count': grouped.size(), 'last': grouped.max()})
+
     def get_discovery_recommendations(self, user_id, interactions_df, events_df, limit=10):
         """Get serendipitous recommendations to help users discover new experiences"""
         # Get user's past interactions
-        user_interactions = interactions_df[interactions_df['user_id'] == user_id]
+        user_interactions = get_interaction_store(interactions_df).user_interactions(user_id)
         
         if user_interactions.empty:
             # No user history - return diverse popular events across categories
@@ -73,7 +163,9 @@ class HybridRecommender:
         
         # Get categories the user has engaged with
         user_events = events_df[events_df['event_id'].isin(user_interactions['event_id'])]
-        user_categories = user_events['category'].value_counts().to_dict()
+        user_categories = user_events['category'].value_counts()
+        # Dictionary-encoded columns also count categories with no rows
+        user_categories = user_categories[user_categories > 0].to_dict()
         
         # Find less explored categories for this user
         all_categories = events_df['category'].unique()
@@ -89,7 +181,7 @@ class HybridRecommender:
             discovery_events = events_df[events_df['category'].isin(target_categories)]
             
             # Get popular events from these categories
-            event_popularity = interactions_df.groupby('event_id').size().reset_index(name='interaction_count')
+            event_popularity = self._event_popularity(interactions_df)
             popular_events = event_popularity.sort_values('interaction_count', ascending=False)
             
             discovery_events = discovery_events.merge(popular_events, on='event_id', how='left')
@@ -124,10 +216,15 @@ class HybridRecommender:
         
         return diverse_events
     
+    def _event_popularity(self, interactions_df):
+        """Interaction count per event as an (event_id, interaction_count) frame"""
+        counts = get_interaction_store(interactions_df).event_counts()
+        return counts.rename_axis('event_id').reset_index(name='interaction_count')
+    
     def _get_diverse_popular_events(self, interactions_df, events_df, limit):
         """Get popular events with category diversity"""
         # Calculate event popularity
-        event_popularity = interactions_df.groupby('event_id').size().reset_index(name='interaction_count')
+        event_popularity = self._event_popularity(interactions_df)
         
         # Join with events data
         popular_events = events_df.merge(event_popularity, on='event_id', how='left')
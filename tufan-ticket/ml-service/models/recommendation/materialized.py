@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+from models.data.artifacts import publish, save_arrays, staging_path
+
+class MaterializedRecommendations:
+    """
+    Fixed-width store of precomputed top-K recommendations per user.
+
+    Rows are the hybrid ranking computed with limit=top_k, so scores are
+    normalized over each model's top 2*top_k candidates. A request for a
+    smaller limit gets a prefix of that ranking; the live path normalizes
+    over 2*limit candidates instead, so its weighted scores (and, where
+    the two models disagree, the order) can differ from the stored ones.
+    """
+
+    def __init__(self, top_k=20):
+        self.top_k = top_k
+        self.user_rows = {}
+        # Row i holds catalog positions (-1 padded) and scores for one user
+        self.items = np.full((0, top_k), -1, dtype=np.int32)
+        self.scores = np.zeros((0, top_k), dtype=np.float32)
+        self.catalog_size = 0
+        # Per-user (interaction count, last timestamp) at build time
+        self.signatures = None
+
+    def __len__(self):
+        return len(self.user_rows)
+
+    def __contains__(self, user_id):
+        return user_id in self.user_rows
+
+    def reserve(self, user_ids):
+        """Allocate rows for users that are not yet in the store"""
+        new_users = [user for user in user_ids if user not in self.user_rows]
+        if not new_users:
+            return
+
+        start = len(self.user_rows)
+        for i, user in enumerate(new_users):
+            self.user_rows[user] = start + i
+
+        extra_items = np.full((len(new_users), self.top_k), -1, dtype=np.int32)
+        extra_scores = np.zeros((len(new_users), self.top_k), dtype=np.float32)
+        self.items = np.concatenate([self.items, extra_items])
+        self.scores = np.concatenate([self.scores, extra_scores])
+
+    def put(self, user_id, positions, scores):
+        """Store the ranked catalog positions and scores for one user"""
+        if not self.items.flags.writeable:
+            # Copy-on-write when the store was loaded read-only from disk
+            self.items = np.array(self.items)
+            self.scores = np.array(self.scores)
+
+        row = self.user_rows[user_id]
+        n = min(len(positions), self.top_k)
+        self.items[row] = -1
+        self.scores[row] = 0
+        self.items[row, :n] = positions[:n]
+        self.scores[row, :n] = scores[:n]
+
+    def get(self, user_id, limit):
+        """Return (positions, scores) for a user, or None if not materialized"""
+        row = self.user_rows.get(user_id)
+        if row is None or limit > self.top_k:
+            return None
+
+        positions = self.items[row, :limit]
+        n = np.count_nonzero(positions >= 0)
+        return positions[:n], self.scores[row, :n]
+
+    def save(self, path):
+        """
+        Write the store to a directory of .npy files.
+
+        The files are written to a staging directory and published in one
+        rename, so stores already loaded from path (here or in other
+        workers) keep mapping the previous files rather than seeing them
+        truncated and rewritten.
+        """
+        user_ids = np.empty(len(self.user_rows), dtype=object)
+        for user, row in self.user_rows.items():
+            user_ids[row] = user
+
+        tmp_path = staging_path(path)
+        save_arrays(
+            tmp_path,
+            items=self.items,
+            scores=self.scores,
+            user_ids=user_ids.astype(str),
+            catalog_size=np.array([self.catalog_size])
+        )
+        if self.signatures is not None:
+            self.signatures.to_pickle(os.path.join(tmp_path, 'signatures.pkl'))
+        publish(tmp_path, path)
+
+        return self
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a store written by save(), memory-mapping the top-K arrays"""
+        items = np.load(os.path.join(path, 'items.npy'), mmap_mode=mmap_mode)
+        store = cls(top_k=items.shape[1])
+        store.items = items
+        store.scores = np.load(os.path.join(path, 'scores.npy'), mmap_mode=mmap_mode)
+        user_ids = np.load(os.path.join(path, 'user_ids.npy'))
+        store.user_rows = dict(zip(user_ids.tolist(), range(len(user_ids))))
+        store.catalog_size = int(np.load(os.path.join(path, 'catalog_size.npy'))[0])
+
+        signatures_path = os.path.join(path, 'signatures.pkl')
+        if os.path.exists(signatures_path):
+            store.signatures = pd.read_pickle(signatures_path)
+
+        return store
@@ -0,0 +1,198 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+from models.data.artifacts import save_arrays, load_array
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores in descending order, skipping -inf"""
+    k = min(k, np.isfinite(scores).sum())
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def _as_query(query):
+    """Flatten a (1, d) dense or sparse query into a 1-D dense vector"""
+    if sp.issparse(query):
+        return query.toarray().ravel()
+    return np.asarray(query, dtype=np.float64).ravel()
+
+class ExactIndex:
+    """Brute-force inner-product index, the exact baseline"""
+
+    def __init__(self):
+        self.vectors = None
+
+    def build(self, vectors):
+        self.vectors = vectors
+        return self
+
+    def save(self, path):
+        """Nothing to persist beyond the vectors themselves"""
+        return self
+
+    def restore(self, path, vectors, mmap_mode='r'):
+        return self.build(vectors)
+
+    def search(self, query, k, exclude=None):
+        """Return (indices, scores) of the top-k items for a query vector"""
+        scores = np.asarray(self.vectors @ _as_query(query), dtype=np.float64).ravel()
+        if exclude is not None and len(exclude):
+            scores[exclude] = float('-inf')
+
+        indices = top_k_indices(scores, k)
+        return indices, scores[indices]
+
+class IVFIndex:
+    """
+    Inverted-file approximate inner-product index.
+
+    Items are clustered with k-means into n_lists buckets at build time; a
+    query scores only the items in the n_probe buckets whose centroids have
+    the highest inner product with it.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, random_state=42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.vectors = None
+        self.centroids = None
+        self._order = None
+        self._offsets = None
+        self._list_vectors = None
+
+    def build(self, vectors):
+        self.vectors = vectors
+        n_items = vectors.shape[0]
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_items)))
+        n_lists = min(n_lists, n_items)
+
+        # Lloyd's k-means, initialized from a random sample of items
+        rng = np.random.RandomState(self.random_state)
+        centroids = self._dense_rows(rng.choice(n_items, n_lists, replace=False))
+        for _ in range(self.n_iter):
+            assignments = self._assign(centroids)
+            centroids = self._update(assignments, centroids)
+
+        assignments = self._assign(centroids)
+        self.centroids = centroids
+
+        # Group item ids by list with a sorted permutation plus offsets
+        self._order = np.argsort(assignments, kind='stable')
+        self._offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=self._offsets[1:])
+
+        # Store vectors in list order so each probed list is a contiguous slice
+        self._list_vectors = vectors[self._order]
+
+        return self
+
+    def save(self, path):
+        """
+        Persist the trained lists and the list-ordered vectors; the vectors
+        themselves are saved by the owning model
+        """
+        save_arrays(path, ivf_centroids=self.centroids, ivf_order=self._order, ivf_offsets=self._offsets)
+        if sp.issparse(self._list_vectors):
+            list_vectors = self._list_vectors.tocsr()
+            save_arrays(
+                path,
+                ivf_list_data=list_vectors.data,
+                ivf_list_indices=list_vectors.indices,
+                ivf_list_indptr=list_vectors.indptr
+            )
+        else:
+            save_arrays(path, ivf_list_vectors=np.asarray(self._list_vectors))
+        return self
+
+    def restore(self, path, vectors, mmap_mode='r'):
+        """
+        Reattach saved lists to the model's vectors without re-running k-means.
+
+        The list-ordered vectors are memory-mapped rather than rebuilt with
+        vectors[order], which would copy them into every process.
+        """
+        self.vectors = vectors
+        self.centroids = load_array(path, 'ivf_centroids', mmap_mode)
+        self._order = load_array(path, 'ivf_order', mmap_mode)
+        self._offsets = load_array(path, 'ivf_offsets', mmap_mode)
+
+        if os.path.exists(os.path.join(path, 'ivf_list_vectors.npy')):
+            self._list_vectors = load_array(path, 'ivf_list_vectors', mmap_mode)
+        elif os.path.exists(os.path.join(path, 'ivf_list_data.npy')):
+            self._list_vectors = sp.csr_matrix(
+                (
+                    load_array(path, 'ivf_list_data', mmap_mode),
+                    load_array(path, 'ivf_list_indices', mmap_mode),
+                    load_array(path, 'ivf_list_indptr', mmap_mode)
+                ),
+                shape=vectors.shape,
+                copy=False
+            )
+        else:
+            # Saved before the list-ordered vectors were persisted: search
+            # gathers the probed rows from the vectors instead
+            self._list_vectors = None
+        return self
+
+    def _dense_rows(self, rows):
+        block = self.vectors[rows]
+        return block.toarray() if sp.issparse(block) else np.array(block, dtype=np.float64)
+
+    def _assign(self, centroids):
+        """Nearest centroid (squared L2) for every item"""
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; ||x||^2 is constant per row
+        cross = np.asarray(self.vectors @ centroids.T)
+        distances = (centroids ** 2).sum(axis=1) - 2 * cross
+        return distances.argmin(axis=1)
+
+    def _update(self, assignments, centroids):
+        n_lists = len(centroids)
+        membership = sp.csr_matrix(
+            (np.ones(len(assignments)), (assignments, np.arange(len(assignments)))),
+            shape=(n_lists, len(assignments))
+        )
+        sums = membership @ self.vectors
+        sums = sums.toarray() if sp.issparse(sums) else np.asarray(sums)
+        counts = np.asarray(membership.sum(axis=1)).ravel()
+
+        # Keep the previous centroid for lists that ended up empty
+        updated = centroids.copy()
+        filled = counts > 0
+        updated[filled] = sums[filled] / counts[filled, None]
+        return updated
+
+    def search(self, query, k, exclude=None):
+        """Return (indices, scores) of the approximate top-k items for a query vector"""
+        query = _as_query(query)
+
+        # Pick the lists whose centroids score highest against the query
+        probe = top_k_indices(self.centroids @ query, self.n_probe)
+        positions = np.concatenate([
+            np.arange(self._offsets[l], self._offsets[l + 1]) for l in probe
+        ])
+        candidates = self._order[positions]
+        if self._list_vectors is not None:
+            block = self._list_vectors[positions]
+        else:
+            block = self.vectors[candidates]
+        scores = np.asarray(block @ query, dtype=np.float64).ravel()
+        if exclude is not None and len(exclude):
+            scores[np.isin(candidates, exclude)] = float('-inf')
+
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+INDEX_TYPES = {
+    'exact': ExactIndex,
+    'ivf': IVFIndex,
+}
+
+def make_index(kind='exact', **params):
+    """Create an unbuilt vector index by name"""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {kind}")
+    return INDEX_TYPES[kind](**params)
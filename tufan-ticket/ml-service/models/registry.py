@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+class _Entry:
+    """One named model: its loader, load state and the loaded value"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.state = 'pending'
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == 'ready':
+            return self.value
+
+        # Concurrent callers wait for the one load in progress
+        with self._lock:
+            if self.state == 'ready':
+                return self.value
+
+            self.state = 'loading'
+            start = time.perf_counter()
+            try:
+                self.value = self.loader()
+            except Exception as e:
+                self.state = 'failed'
+                self.error = str(e)
+                raise
+            self.load_seconds = time.perf_counter() - start
+            self.error = None
+            self.state = 'ready'
+
+            return self.value
+
+    def reset_after_fork(self):
+        """Forget a load that was in progress in the parent process"""
+        self._lock = threading.Lock()
+        if self.state == 'loading':
+            self.state = 'pending'
+
+    def status(self):
+        status = {'state': self.state}
+        if self.load_seconds is not None:
+            status['load_seconds'] = round(self.load_seconds, 3)
+        if self.error is not None:
+            status['error'] = self.error
+        return status
+
+class ModelRegistry:
+    """
+    Named models loaded on first use or by a background warmup.
+
+    Each model is registered with a loader; get() runs it once (concurrent
+    callers wait for the same load) and returns the result. A worker that
+    only serves some endpoints therefore only pays for the models those
+    endpoints use, and status() reports what is loaded for readiness checks.
+    A failed load is retried on the next get().
+
+    Forking (e.g. gunicorn --preload) while a warmup is running would leave
+    the child with a lock no thread will release, so children reset
+    in-progress loads and restart the warmup.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.warmup_thread = None
+        self._warmup_names = None
+        self._warming = False
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, name, loader):
+        self._entries[name] = _Entry(loader)
+
+    def get(self, name):
+        return self._entries[name].get()
+
+    def is_ready(self, name):
+        return self._entries[name].state == 'ready'
+
+    def ready(self):
+        return all(entry.state == 'ready' for entry in self._entries.values())
+
+    def status(self):
+        return {name: entry.status() for name, entry in self._entries.items()}
+
+    def warmup(self, names=None, background=True):
+        """Load the named models (all by default), in a daemon thread unless background=False"""
+        names = list(self._entries) if names is None else list(names)
+        self._warmup_names = names
+        self._warming = True
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    # The failure is recorded in the entry's status
+                    pass
+            self._warming = False
+
+        if not background:
+            run()
+            return
+
+        self.warmup_thread = threading.Thread(target=run, name='model-warmup', daemon=True)
+        self.warmup_thread.start()
+
+    def _after_fork(self):
+        # The parent's warmup thread is gone in the child (threading has
+        # already marked it stopped), so go by the flag it clears when done
+        warming = self._warming
+        for entry in self._entries.values():
+            entry.reset_after_fork()
+
+        # Threads don't survive fork; restart an unfinished warmup in the child
+        self.warmup_thread = None
+        if warming:
+            self.warmup(self._warmup_names)
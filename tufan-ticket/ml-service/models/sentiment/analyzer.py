@@ -1,60 +1,203 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-from transformers import pipeline
-import numpy as np
+import os
+import threading
+import time
+from models.data.artifacts import has_artifact, publish, read_meta, staging_path, write_meta
+from models.metrics import metrics, stage
+from models.sentiment.aspects import AspectExtractor
+
+TRANSFORMER_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+
+def _load_model(backend, onnx_path=None):
+    """
+    The transformer and its tokenizer for an inference backend:
+      - pytorch: the float32 model in eager mode
+      - quantized: the same model with Linear layers dynamically quantized
+        to int8 (weights int8, activations quantized per batch)
+      - onnx: the model exported to ONNX and run by ONNX Runtime, which
+        needs optimum[onnxruntime]. With onnx_path, the export is saved
+        there and later loads skip it.
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    
+    tokenizer = AutoTokenizer.from_pretrained(TRANSFORMER_MODEL)
+    
+    if backend == 'onnx':
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError:
+            raise ImportError('optimum[onnxruntime] is required for the onnx sentiment backend')
+        
+        if onnx_path and has_artifact(onnx_path) and read_meta(onnx_path).get('model') == TRANSFORMER_MODEL:
+            return ORTModelForSequenceClassification.from_pretrained(onnx_path), tokenizer
+        
+        model = ORTModelForSequenceClassification.from_pretrained(TRANSFORMER_MODEL, export=True)
+        if onnx_path:
+            tmp_path = staging_path(onnx_path)
+            model.save_pretrained(tmp_path)
+            write_meta(tmp_path, {'model': TRANSFORMER_MODEL})
+            publish(tmp_path, onnx_path)
+        return model, tokenizer
+    
+    model = AutoModelForSequenceClassification.from_pretrained(TRANSFORMER_MODEL)
+    model.eval()
+    if backend == 'quantized':
+        import torch
+        
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    return model, tokenizer
 
 class SentimentAnalyzer:
-    def __init__(self, use_transformers=True):
-        """Initialize sentiment analyzer with either VADER or transformer models"""
+    def __init__(self, use_transformers=True, batch_size=32, aspect_lexicon=None,
+                 cascade=False, uncertainty_band=0.5, escalate_length=512, backend='pytorch',
+                 onnx_path=None):
+        """
+        Initialize sentiment analyzer with either VADER or transformer models.
+        
+        With cascade=True every text is scored by VADER first and escalated to
+        the transformer only when the VADER compound score is within
+        uncertainty_band of zero or the text is longer than escalate_length
+        characters, so short, clearly polar reviews never reach the model.
+        
+        backend picks how the transformer runs on CPU: 'pytorch' (float32),
+        'quantized' (dynamic int8) or 'onnx' (ONNX Runtime). With onnx_path,
+        the ONNX export is done once and saved there for later processes.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown sentiment backend: {backend}")
+        
         self.use_transformers = use_transformers
+        self.batch_size = batch_size
+        self.analyzer = None
+        self.cascade = cascade
+        self.uncertainty_band = uncertainty_band
+        self.escalate_length = escalate_length
+        self.backend = backend
+        self.onnx_path = onnx_path
         
-        if use_transformers:
-            # Use HuggingFace's transformers for sentiment analysis
-            self.model = pipeline(
-                "sentiment-analysis", 
-                model="distilbert-base-uncased-finetuned-sst-2-english",
-                truncation=True, 
-                max_length=512
-            )
+        # Texts seen and escalated by the cascade, and time spent per tier
+        self._stats_lock = threading.Lock()
+        self.reset_cascade_stats()
+        
+        # Aspect lexicon: a dict, a path to a JSON file, or the built-in default
+        if isinstance(aspect_lexicon, str):
+            self.aspect_extractor = AspectExtractor.from_file(aspect_lexicon)
         else:
-            # Use VADER sentiment analyzer
-            try:
-                nltk.data.find('vader_lexicon')
-            except LookupError:
-                nltk.download('vader_lexicon')
-            
-            self.analyzer = SentimentIntensityAnalyzer()
+            self.aspect_extractor = AspectExtractor(aspect_lexicon)
+        
+        # transformers and nltk are imported and loaded on first use (or by
+        # load()), so constructing an analyzer is cheap
+        self.model = None
+        self._load_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    def _after_fork(self):
+        # A load or stats update running in another thread of the parent
+        # (e.g. the registry's warmup) leaves its lock held for good in the
+        # child; the registry restarts that load, so give it fresh locks
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def version(self):
+        """Identifies the scoring configuration, so cached results from another one are never reused"""
+        if self.cascade:
+            return f'cascade:{TRANSFORMER_MODEL}:{self.backend}:{self.uncertainty_band}:{self.escalate_length}'
+        return f'transformer:{TRANSFORMER_MODEL}:{self.backend}' if self.use_transformers else 'vader'
+    
+    def load(self):
+        """Load the configured model now rather than on the first request"""
+        if self.use_transformers or self.cascade:
+            self._load_transformer()
+        if self.cascade or not self.use_transformers:
+            self._load_vader()
+        
+        return self
+    
+    def _load_transformer(self):
+        """Load the HuggingFace sentiment pipeline, once"""
+        if self.model is not None:
+            return self.model
+        
+        with self._load_lock:
+            if self.model is None:
+                from transformers import pipeline
+                
+                if self.backend == 'pytorch':
+                    model, tokenizer = TRANSFORMER_MODEL, None
+                else:
+                    model, tokenizer = _load_model(self.backend, self.onnx_path)
+                
+                self.model = pipeline(
+                    "sentiment-analysis", 
+                    model=model,
+                    tokenizer=tokenizer,
+                    truncation=True, 
+                    max_length=512
+                )
+        
+        return self.model
+    
+    def _load_vader(self):
+        """Load the VADER sentiment analyzer"""
+        if self.analyzer is not None:
+            return self.analyzer
+        
+        with self._load_lock:
+            if self.analyzer is None:
+                import nltk
+                from nltk.sentiment import SentimentIntensityAnalyzer
+                
+                try:
+                    nltk.data.find('vader_lexicon')
+                except LookupError:
+                    nltk.download('vader_lexicon')
+                
+                self.analyzer = SentimentIntensityAnalyzer()
+        
+        return self.analyzer
     
     def analyze(self, text):
         """Analyze the sentiment of a text"""
         if not text:
             return {'sentiment': 'neutral', 'score': 0, 'confidence': 0}
         
+        if self.cascade:
+            return self.analyze_batch([text])[0]
+        
         if self.use_transformers:
+            model = self._load_transformer()
             try:
                 # Use transformer model for analysis
-                result = self.model(text)[0]
-                label = result['label'].lower()
-                score = result['score']
-                
-                # Convert to consistent format
-                sentiment = 'positive' if label == 'positive' else 'negative'
-                sentiment_score = score if sentiment == 'positive' else -score
-                
-                return {
-                    'sentiment': sentiment,
-                    'score': sentiment_score,
-                    'confidence': score
-                }
-            except Exception as e:
+                result = model(text)[0]
+                return self._format_transformer_result(result)
+            except Exception:
                 # Fallback to VADER if transformer model fails
                 return self._analyze_with_vader(text)
         else:
             return self._analyze_with_vader(text)
     
+    def _format_transformer_result(self, result):
+        """Convert a pipeline output to the analyzer's result format"""
+        label = result['label'].lower()
+        score = result['score']
+        
+        # Convert to consistent format
+        sentiment = 'positive' if label == 'positive' else 'negative'
+        sentiment_score = score if sentiment == 'positive' else -score
+        
+        return {
+            'sentiment': sentiment,
+            'score': sentiment_score,
+            'confidence': score
+        }
+    
     def _analyze_with_vader(self, text):
         """Analyze sentiment using VADER"""
-        scores = self.analyzer.polarity_scores(text)
+        # VADER also backs the transformer fallback and aspect scoring
+        scores = self._load_vader().polarity_scores(text)
         
         # Determine sentiment based on compound score
         compound = scores['compound']
@@ -77,9 +220,118 @@ class SentimentAnalyzer:
             }
         }
     
-    def analyze_batch(self, texts):
-        """Analyze sentiment for a batch of texts"""
-        return [self.analyze(text) for text in texts]
+    def analyze_batch(self, texts, batch_size=None, return_tiers=False):
+        """
+        Analyze sentiment for a batch of texts.
+        
+        With return_tiers=True, returns (results, tiers), where tiers[i] is
+        the tier that scored texts[i]: 'vader', 'transformer', or 'fallback'
+        for VADER standing in after a failed transformer pass.
+        """
+        tiers = ['vader'] * len(texts)
+        if self.cascade:
+            results = self._analyze_cascade(texts, batch_size, tiers)
+        elif not self.use_transformers:
+            results = [self.analyze(text) for text in texts]
+        else:
+            results = self._analyze_transformer(texts, batch_size, tiers)
+        
+        return (results, tiers) if return_tiers else results
+    
+    def _analyze_transformer(self, texts, batch_size, tiers):
+        results = [None] * len(texts)
+        
+        # Empty texts don't go through the model
+        pending = []
+        for i, text in enumerate(texts):
+            if text:
+                pending.append(i)
+            else:
+                results[i] = self.analyze(text)
+        
+        self._transformer_batch(texts, pending, results, tiers, batch_size)
+        return results
+    
+    def _transformer_batch(self, texts, pending, results, tiers, batch_size=None):
+        """Score texts[i] for i in pending with the transformer, writing into results and tiers"""
+        batch_size = batch_size or self.batch_size
+        
+        # Bucket by length so each forward pass pads to a similar sequence length
+        pending = sorted(pending, key=lambda i: len(texts[i]))
+        
+        model = self._load_transformer()
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            chunk_texts = [texts[i] for i in chunk]
+            metrics.counter('ml_sentiment_texts_total', len(chunk_texts), tier='transformer')
+            try:
+                with stage('sentiment.transformer'):
+                    outputs = model(chunk_texts, batch_size=len(chunk_texts))
+                chunk_results = [self._format_transformer_result(output) for output in outputs]
+                tier = 'transformer'
+            except Exception:
+                # Fallback to VADER if transformer model fails
+                chunk_results = [results[i] or self._analyze_with_vader(texts[i]) for i in chunk]
+                tier = 'fallback'
+            
+            for i, result in zip(chunk, chunk_results):
+                results[i] = result
+                tiers[i] = tier
+    
+    def _needs_escalation(self, text, result):
+        return abs(result['score']) < self.uncertainty_band or len(text) > self.escalate_length
+    
+    def _analyze_cascade(self, texts, batch_size, tiers):
+        """Score with VADER, then re-score ambiguous or long texts with the transformer"""
+        start = time.perf_counter()
+        with stage('sentiment.vader'):
+            results = [self._analyze_with_vader(text) if text else self.analyze(text) for text in texts]
+        escalated = [i for i, text in enumerate(texts) if text and self._needs_escalation(text, results[i])]
+        vader_seconds = time.perf_counter() - start
+        metrics.counter('ml_sentiment_texts_total', len(texts), tier='vader')
+        metrics.counter('ml_sentiment_escalations_total', len(escalated))
+        
+        start = time.perf_counter()
+        self._transformer_batch(texts, escalated, results, tiers, batch_size)
+        transformer_seconds = time.perf_counter() - start
+        
+        with self._stats_lock:
+            stats = self._cascade_stats
+            stats['texts'] += len(texts)
+            stats['escalated'] += len(escalated)
+            stats['vader_seconds'] += vader_seconds
+            if escalated:
+                stats['transformer_seconds'] += transformer_seconds
+        
+        return results
+    
+    def reset_cascade_stats(self):
+        with self._stats_lock:
+            self._cascade_stats = {'texts': 0, 'escalated': 0, 'vader_seconds': 0.0, 'transformer_seconds': 0.0}
+    
+    def cascade_stats(self):
+        """Escalation rate and mean per-text latency of each cascade tier"""
+        with self._stats_lock:
+            stats = dict(self._cascade_stats)
+        
+        texts, escalated = stats['texts'], stats['escalated']
+        return {
+            'texts': texts,
+            'escalated': escalated,
+            'escalation_rate': escalated / texts if texts else 0.0,
+            'tiers': {
+                'vader': {
+                    'texts': texts,
+                    'seconds': round(stats['vader_seconds'], 6),
+                    'mean_ms': round(stats['vader_seconds'] * 1000 / texts, 3) if texts else 0.0
+                },
+                'transformer': {
+                    'texts': escalated,
+                    'seconds': round(stats['transformer_seconds'], 6),
+                    'mean_ms': round(stats['transformer_seconds'] * 1000 / escalated, 3) if escalated else 0.0
+                }
+            }
+        }
     
     def extract_aspects(self, text):
         """
@@ -87,31 +339,4 @@ class SentimentAnalyzer:
         This is a simplified implementation - in practice, you would use a more 
         sophisticated approach like aspect-based sentiment analysis
         """
-        aspects = {
-            'price': ['price', 'cost', 'expensive', 'cheap', 'affordable', 'worth'],
-            'venue': ['venue', 'location', 'place', 'stadium', 'arena', 'hall'],
-            'lineup': ['lineup', 'artist', 'performer', 'band', 'dj', 'musician'],
-            'organization': ['organized', 'staff', 'service', 'management', 'crowd'],
-            'sound': ['sound', 'audio', 'acoustics', 'volume', 'music'],
-            'experience': ['experience', 'time', 'enjoyed', 'fun', 'boring', 'great']
-        }
-        
-        text_lower = text.lower()
-        
-        # Find mentioned aspects
-        mentioned_aspects = {}
-        for aspect, keywords in aspects.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    # Find the sentence containing this keyword
-                    sentences = text_lower.split('.')
-                    for sentence in sentences:
-                        if keyword in sentence:
-                            # Analyze sentiment for this sentence
-                            sentiment = self._analyze_with_vader(sentence)
-                            
-                            if aspect not in mentioned_aspects:
-                                mentioned_aspects[aspect] = sentiment
-                            break
-        
-        return mentioned_aspects
\ No newline at end of file
+        return self.aspect_extractor.extract(text, self._analyze_with_vader)
@@ -0,0 +1,76 @@
+import json
+import re
+
+DEFAULT_ASPECTS = {
+    'price': ['price', 'cost', 'expensive', 'cheap', 'affordable', 'worth'],
+    'venue': ['venue', 'location', 'place', 'stadium', 'arena', 'hall'],
+    'lineup': ['lineup', 'artist', 'performer', 'band', 'dj', 'musician'],
+    'organization': ['organized', 'staff', 'service', 'management', 'crowd'],
+    'sound': ['sound', 'audio', 'acoustics', 'volume', 'music'],
+    'experience': ['experience', 'time', 'enjoyed', 'fun', 'boring', 'great']
+}
+
+SENTENCE_SPLIT = re.compile(r'[.!?\n]+')
+
+class AspectExtractor:
+    """
+    Single-pass aspect matcher over a keyword lexicon.
+
+    All keywords are compiled into one word-bounded regex alternation, so
+    "time" matches "time" and "times" but not "sometimes".
+    """
+
+    def __init__(self, aspects=None):
+        aspects = DEFAULT_ASPECTS if aspects is None else aspects
+
+        # Blank keywords would compile to an empty alternative that matches
+        # everywhere; aspects left without keywords can never be found
+        self.aspects = {}
+        for aspect, keywords in aspects.items():
+            keywords = [keyword.strip().lower() for keyword in keywords if keyword.strip()]
+            if keywords:
+                self.aspects[aspect] = keywords
+
+        # The first aspect listing a keyword owns it
+        self.keyword_aspects = {}
+        for aspect, keywords in self.aspects.items():
+            for keyword in keywords:
+                self.keyword_aspects.setdefault(keyword, aspect)
+
+        # Longest keywords first so multi-word entries win over their prefixes
+        keywords = sorted(self.keyword_aspects, key=len, reverse=True)
+        alternation = '|'.join(re.escape(keyword) for keyword in keywords)
+        self.pattern = re.compile(r'\b(' + alternation + r')(?:e?s)?\b') if keywords else None
+
+    @classmethod
+    def from_file(cls, path):
+        """Load an {aspect: [keywords]} lexicon from a JSON file"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def extract(self, text, score_sentence):
+        """
+        Map each mentioned aspect to the sentiment of the first sentence
+        mentioning it, scoring every distinct sentence at most once.
+        """
+        found = {}
+        sentence_scores = {}
+        if self.pattern is None:
+            return found
+
+        for sentence in SENTENCE_SPLIT.split(text.lower()):
+            aspects = {self.keyword_aspects[keyword] for keyword in self.pattern.findall(sentence)}
+            aspects.difference_update(found)
+            if not aspects:
+                continue
+
+            if sentence not in sentence_scores:
+                sentence_scores[sentence] = score_sentence(sentence)
+            for aspect in aspects:
+                found[aspect] = sentence_scores[sentence]
+
+            if len(found) == len(self.aspects):
+                break
+
+        # Report aspects in lexicon order
+        return {aspect: found[aspect] for aspect in self.aspects if aspect in found}
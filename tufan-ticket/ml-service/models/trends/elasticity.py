@@ -0,0 +1,122 @@
+# models/trends/elasticity.py
+import numpy as np
+import pandas as pd
+from models.data.interactions import get_interaction_store
+
+class PriceElasticityTable:
+    """
+    Per-event purchase counts and per-category price elasticity.
+
+    Elasticity is the slope of log(purchases + 1) on log(price) across the
+    events of a category. The table keeps the least-squares sums for each
+    category, so a new purchase updates them in O(1) and an elasticity
+    lookup is a few arithmetic operations. Log prices are taken relative to
+    one event's in each category, which leaves the slope unchanged but keeps
+    the sums small, so a category whose prices are all equal has a variance
+    of exactly zero rather than rounding noise.
+    """
+
+    def __init__(self, min_events=3):
+        self.min_events = min_events
+        self.event_positions = {}
+        self.prices = None
+        self.purchases = None
+        self.category_codes = None
+        self.categories = None
+        self.x_offsets = None
+        self.sums = None
+        self.store = None
+        self.events_source = None
+
+    def build(self, events_df, interactions_df):
+        """Count purchases per event and accumulate the regression sums per category"""
+        self.store = get_interaction_store(interactions_df)
+        self.events_source = events_df
+
+        # Count purchases for every event in one pass over the log
+        purchase_counts = pd.Series(
+            np.bincount(
+                self.store.event_codes,
+                weights=self.store.type_values({'purchase': 1.0}),
+                minlength=len(self.store.event_ids)
+            ),
+            index=self.store.event_ids
+        )
+
+        self.event_positions = dict(zip(events_df['event_id'], range(len(events_df))))
+        self.prices = np.array(events_df['price'], dtype=np.float64)
+        # Purchases are updated in place, so take a writable copy
+        self.purchases = np.array(events_df['event_id'].map(purchase_counts).fillna(0), dtype=np.float64)
+        self.category_codes, self.categories = pd.factorize(events_df['category'])
+
+        # Per-category sums of n, x, x^2, y and xy for x = log(price) relative
+        # to the category's first event, y = log(purchases + 1)
+        n_categories = len(self.categories)
+        first_events = np.unique(self.category_codes, return_index=True)[1]
+        self.x_offsets = np.log(self.prices[first_events])
+        x = np.log(self.prices) - self.x_offsets[self.category_codes]
+        y = np.log(self.purchases + 1)
+        self.sums = np.stack([
+            np.bincount(self.category_codes, minlength=n_categories).astype(np.float64),
+            np.bincount(self.category_codes, weights=x, minlength=n_categories),
+            np.bincount(self.category_codes, weights=x * x, minlength=n_categories),
+            np.bincount(self.category_codes, weights=y, minlength=n_categories),
+            np.bincount(self.category_codes, weights=x * y, minlength=n_categories)
+        ], axis=1)
+
+        return self
+
+    def is_current(self, events_df, interactions_df):
+        """Whether the table was built from these frames (and the log hasn't grown)"""
+        return (
+            self.events_source is events_df
+            and self.store is get_interaction_store(interactions_df)
+        )
+
+    def record_purchase(self, event_id, count=1):
+        """Add purchases for an event, updating its category's sums in place"""
+        position = self.event_positions.get(event_id)
+        if position is None:
+            return
+
+        category_code = self.category_codes[position]
+        x = np.log(self.prices[position]) - self.x_offsets[category_code]
+        delta_y = np.log(self.purchases[position] + count + 1) - np.log(self.purchases[position] + 1)
+        self.purchases[position] += count
+
+        category_sums = self.sums[category_code]
+        category_sums[3] += delta_y
+        category_sums[4] += x * delta_y
+
+    def event(self, event_id):
+        """(price, category code) for an event, or None if unknown"""
+        position = self.event_positions.get(event_id)
+        if position is None:
+            return None
+        return self.prices[position], self.category_codes[position]
+
+    def elasticity(self, category_code):
+        """Least-squares price elasticity for a category, or None with too few events"""
+        n, sum_x, sum_xx, sum_y, sum_xy = self.sums[category_code]
+        if n < self.min_events:
+            return None
+
+        denominator = n * sum_xx - sum_x ** 2
+        if denominator <= 1e-12 * n * sum_xx:
+            # All prices equal (to rounding) - no price signal
+            return 0.0
+
+        return (n * sum_xy - sum_x * sum_y) / denominator
+
+    def __getstate__(self):
+        # The interaction store and source frame are rebuilt, not persisted
+        state = self.__dict__.copy()
+        state['store'] = None
+        state['events_source'] = None
+        return state
+
+    def __setstate__(self, state):
+        # Tables saved before log prices were made relative kept plain sums
+        if 'x_offsets' not in state:
+            state['x_offsets'] = None if state['categories'] is None else np.zeros(len(state['categories']))
+        self.__dict__.update(state)
@@ -1,8 +1,13 @@
 # models/trends/forecasting.py
+import os
+import joblib
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from datetime import datetime, timedelta
+from models.data.artifacts import publish, staging_path, write_meta
+from models.data.interactions import get_interaction_store
+from models.metrics import timed
+from models.trends.elasticity import PriceElasticityTable
 # Remove the Prophet import
 # from prophet import Prophet
 
@@ -10,168 +15,174 @@ class TrendForecaster:
     def __init__(self):
         self.price_model = None
 
+    def save(self, path):
+        """Persist forecaster state to a directory"""
+        tmp_path = staging_path(path)
+        write_meta(tmp_path, {'has_price_model': self.price_model is not None})
+        joblib.dump({'price_model': self.price_model}, os.path.join(tmp_path, 'forecaster.joblib'))
+        publish(tmp_path, path)
+
+        return self
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a forecaster saved with save()"""
+        forecaster = cls()
+
+        state = joblib.load(os.path.join(path, 'forecaster.joblib'), mmap_mode=mmap_mode)
+        forecaster.price_model = state['price_model']
+
+        return forecaster
+
+    @timed('trends.trending')
     def get_trending_events(self, events_df, interactions_df, filters=None, limit=10):
         """Identify trending events based on interaction velocity"""
-        events = events_df.copy()
-        interactions = interactions_df.copy()
+        events = events_df
 
         # Apply filters if provided
         if filters:
+            mask = np.ones(len(events), dtype=bool)
             for key, value in filters.items():
                 if key in events.columns:
-                    events = events[events[key] == value]
+                    mask &= (events[key] == value).to_numpy()
+            events = events[mask]
 
-            # Filter interactions to only include filtered events
-            interactions = interactions[interactions['event_id'].isin(events['event_id'])]
+        store = get_interaction_store(interactions_df)
 
-        # Calculate trend score with time decay
-        now = datetime.now()
-        interactions['days_ago'] = interactions['timestamp'].apply(
-            lambda x: (now - x).days
-        )
+        # Calculate trend score with time decay, in whole days as before
+        now = np.datetime64(datetime.now(), 'ns')
+        days_ago = (now - store.timestamps) // np.timedelta64(1, 'D')
 
-        # Apply exponential decay factor
-        interactions['weight'] = interactions['days_ago'].apply(
-            lambda days: np.exp(-0.1 * days)
-        )
-
-        # Weight by interaction type
+        # Apply exponential decay factor, weighted by interaction type
         interaction_weights = {'view': 1, 'click': 3, 'purchase': 10}
-        interactions['type_weight'] = interactions['interaction_type'].map(interaction_weights)
-
-        # Compute final weight
-        interactions['final_weight'] = interactions['weight'] * interactions['type_weight']
+        final_weight = np.exp(-0.1 * days_ago) * store.type_values(interaction_weights)
 
         # Calculate trending score for each event
-        trend_scores = interactions.groupby('event_id')['final_weight'].sum().reset_index()
-        trend_scores = trend_scores.rename(columns={'final_weight': 'trend_score'})
-
-        # Merge with events data
-        trending_events = events.merge(trend_scores, on='event_id', how='inner')
+        trend_scores = pd.Series(
+            np.bincount(store.event_codes, weights=final_weight, minlength=len(store.event_ids)),
+            index=store.event_ids
+        )
 
-        # Sort by trend score
-        trending_events = trending_events.sort_values('trend_score', ascending=False)
+        # Keep events that have interactions, like an inner join
+        trending_events = events.assign(trend_score=events['event_id'].map(trend_scores))
+        trending_events = trending_events.dropna(subset=['trend_score'])
 
         # Return top trending events
-        return trending_events.head(limit)
+        return trending_events.nlargest(limit, 'trend_score').reset_index(drop=True)
 
     def forecast_ticket_sales(self, event_id, interactions_df, days_ahead=30):
         """Forecast ticket sales for a specific event using linear regression instead of Prophet"""
-        # Filter to purchase interactions for this event
-        event_purchases = interactions_df[
-            (interactions_df['event_id'] == event_id) &
-            (interactions_df['interaction_type'] == 'purchase')
-        ]
-
-        # Get purchase counts by date
-        purchases_by_date = event_purchases.groupby(
-            event_purchases['timestamp'].dt.date
-        ).size().reset_index()
-        purchases_by_date.columns = ['date', 'sales']
-
-        if len(purchases_by_date) < 2:
-            # Not enough data for regression
-            avg_sales = purchases_by_date['sales'].mean() if not purchases_by_date.empty else 1
-
-            # Create future dates
-            future_dates = [datetime.now().date() + timedelta(days=i) for i in range(1, days_ahead + 1)]
-            forecast = pd.DataFrame({
-                'date': future_dates,
-                'predicted_sales': [avg_sales] * days_ahead,
-                'lower_bound': [max(0, avg_sales * 0.8)] * days_ahead,
-                'upper_bound': [avg_sales * 1.2] * days_ahead
-            })
-
-            return forecast
-
-        # Prepare data for linear regression
-        x = np.array(range(len(purchases_by_date))).reshape(-1, 1)
-        y = purchases_by_date['sales'].values
+        return self.forecast_ticket_sales_batch([event_id], interactions_df, days_ahead=days_ahead)[event_id]
+
+    @timed('trends.forecast')
+    def forecast_ticket_sales_batch(self, event_ids, interactions_df, days_ahead=30):
+        """
+        Forecast ticket sales for many events in one pass.
+
+        Daily purchase series for all requested events come from a single
+        groupby, and every event's linear trend (sales vs. index of its
+        purchase days) is fitted at once with closed-form least squares.
+        Returns a dict of event_id -> forecast DataFrame.
+        """
+        store = get_interaction_store(interactions_df)
+        event_ids = list(dict.fromkeys(event_ids))
+
+        # Position of each requested event's code in the request (-1 if unseen)
+        slots = np.full(len(store.event_ids) + 1, -1, dtype=np.int64)
+        for slot, event_id in enumerate(event_ids):
+            code = store.event_lookup.get(event_id)
+            if code is not None:
+                slots[code] = slot
+
+        # Filter to purchase interactions for the requested events
+        purchase_values = store.type_values({'purchase': 1.0}).astype(bool)
+        rows = np.flatnonzero(purchase_values & (slots[store.event_codes] >= 0))
+
+        # Get purchase counts by event and date
+        daily = pd.DataFrame({
+            'slot': slots[store.event_codes[rows]],
+            'date': store.timestamps[rows].astype('datetime64[D]')
+        }).groupby(['slot', 'date']).size().reset_index(name='sales')
+
+        # Per-event regression sums, with x = index of the day within the event's series
+        slot = daily['slot'].to_numpy()
+        x = daily.groupby('slot').cumcount().to_numpy(dtype=np.float64)
+        y = daily['sales'].to_numpy(dtype=np.float64)
+        n_slots = len(event_ids)
+        n = np.bincount(slot, minlength=n_slots).astype(np.float64)
+        sum_x = np.bincount(slot, weights=x, minlength=n_slots)
+        sum_y = np.bincount(slot, weights=y, minlength=n_slots)
+        sum_xx = np.bincount(slot, weights=x * x, minlength=n_slots)
+        sum_xy = np.bincount(slot, weights=x * y, minlength=n_slots)
+
+        # Closed-form least squares; events with fewer than 2 days use their mean (or 1)
+        fitted = n >= 2
+        denominator = np.where(fitted, n * sum_xx - sum_x ** 2, 1.0)
+        slope = np.where(fitted, (n * sum_xy - sum_x * sum_y) / denominator, 0.0)
+        intercept = np.where(fitted, (sum_y - slope * sum_x) / np.maximum(n, 1), 0.0)
+        avg_sales = np.where(n > 0, sum_y / np.maximum(n, 1), 1.0)
+
+        # Predict future sales for every event at once
+        steps = np.arange(days_ahead, dtype=np.float64)
+        predictions = np.where(
+            fitted[:, None],
+            intercept[:, None] + slope[:, None] * (n[:, None] + steps),
+            avg_sales[:, None]
+        )
 
-        # Fit linear model
-        model = LinearRegression()
-        model.fit(x, y)
+        # Ensure values are non-negative, with a simple confidence interval
+        lower_bounds = np.maximum(0, predictions * 0.8)
+        upper_bounds = np.maximum(0, predictions * 1.2)
+        predictions = np.maximum(0, predictions)
 
         # Create future dates
         future_dates = [datetime.now().date() + timedelta(days=i) for i in range(1, days_ahead + 1)]
 
-        # Predict future sales
-        future_x = np.array(range(len(purchases_by_date), len(purchases_by_date) + days_ahead)).reshape(-1, 1)
-        predictions = model.predict(future_x)
-
-        # Create forecast dataframe
-        forecast = pd.DataFrame({
-            'date': future_dates,
-            'predicted_sales': predictions,
-            'lower_bound': predictions * 0.8,  # Simple confidence interval
-            'upper_bound': predictions * 1.2   # Simple confidence interval
-        })
-
-        # Ensure values are non-negative
-        for col in ['predicted_sales', 'lower_bound', 'upper_bound']:
-            forecast[col] = forecast[col].apply(lambda x: max(0, x))
-
-        return forecast
+        return {
+            event_id: pd.DataFrame({
+                'date': future_dates,
+                'predicted_sales': predictions[i],
+                'lower_bound': lower_bounds[i],
+                'upper_bound': upper_bounds[i]
+            })
+            for i, event_id in enumerate(event_ids)
+        }
 
+    @timed('trends.pricing')
     def optimize_pricing(self, event_id, interactions_df, events_df, current_price=None):
         """Optimize pricing based on historical data and price elasticity"""
+        # Purchase counts and per-category elasticity fits are precomputed once
+        if self.price_model is None or not self.price_model.is_current(events_df, interactions_df):
+            self.price_model = PriceElasticityTable().build(events_df, interactions_df)
+
         # Get the event details
-        event = events_df[events_df['event_id'] == event_id]
+        event = self.price_model.event(event_id)
 
-        if event.empty:
+        if event is None:
             raise ValueError(f"Event {event_id} not found")
 
+        price, category_code = event
         if current_price is None:
-            current_price = event['price'].values[0]
-
-        # Get similar events based on category
-        category = event['category'].values[0]
-        similar_events = events_df[events_df['category'] == category]
-
-        # Get purchase data for similar events
-        purchase_data = []
-        for _, similar_event in similar_events.iterrows():
-            similar_id = similar_event['event_id']
-            price = similar_event['price']
-
-            # Count purchases for this event
-            purchases = interactions_df[
-                (interactions_df['event_id'] == similar_id) &
-                (interactions_df['interaction_type'] == 'purchase')
-            ].shape[0]
-
-            purchase_data.append({
-                'event_id': similar_id,
-                'price': price,
-                'purchases': purchases
-            })
-
-        # Fit price-demand model
-        if len(purchase_data) >= 3:
-            # Log-linear model for price elasticity
-            price_df = pd.DataFrame(purchase_data)
-            price_df['log_price'] = np.log(price_df['price'])
-            price_df['log_purchases'] = np.log(price_df['purchases'] + 1)
-
-            # Fit linear regression
-            X = price_df['log_price'].values.reshape(-1, 1)
-            y = price_df['log_purchases'].values
+            current_price = price
 
-            model = LinearRegression()
-            model.fit(X, y)
+        # Calculate price elasticity from similar events in the category
+        elasticity = self.price_model.elasticity(category_code)
 
-            # Calculate price elasticity
-            elasticity = model.coef_[0]
+        if elasticity is None:
+            return current_price  # Default to current price
 
-            # Calculate optimal price based on elasticity
-            if elasticity >= -1:
-                # Inelastic demand - higher price increases revenue
-                optimal_price = current_price * 1.1  # Increase by 10%
-            else:
-                # Elastic demand - optimal markup
-                optimal_markup = -elasticity / (1 + elasticity)
-                optimal_price = current_price * (1 + optimal_markup)
+        # Calculate optimal price based on elasticity
+        if elasticity >= -1:
+            # Inelastic demand - higher price increases revenue
+            optimal_price = current_price * 1.1  # Increase by 10%
+        else:
+            # Elastic demand - optimal markup
+            optimal_markup = -elasticity / (1 + elasticity)
+            optimal_price = current_price * (1 + optimal_markup)
 
-            return round(optimal_price, 2)
+        return round(optimal_price, 2)
 
-        return current_price  # Default to current price
\ No newline at end of file
+    def record_purchase(self, event_id, count=1):
+        """Fold a new purchase into the precomputed elasticity table"""
+        if self.price_model is not None:
+            self.price_model.record_purchase(event_id, count)
@@ -0,0 +1,150 @@
+# models/trends/streaming.py
+import heapq
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+ALL_CATEGORIES = None
+
+def _to_days(timestamp):
+    """Timestamp (or array of timestamps) as fractional days since the epoch"""
+    return np.asarray(timestamp, dtype='datetime64[ns]').astype(np.int64) / 86400e9
+
+class StreamingTrendEngine:
+    """
+    Incrementally maintained trend scores.
+
+    The trend score of an event is sum(type_weight * exp(-decay_rate * days_ago))
+    over its interactions. Every score decays by the same factor as time
+    passes, so the engine stores each score relative to a reference time and
+    only rescales when that reference is moved forward. Ranking is unaffected
+    by the shared decay, which lets top-K be served from per-category heaps
+    that only change when interactions are ingested.
+
+    Unlike TrendForecaster.get_trending_events, elapsed time is continuous
+    rather than rounded down to whole days. Once events are registered,
+    interactions with unregistered events are ignored, so top() only
+    returns events in the catalog.
+    """
+
+    def __init__(self, decay_rate=0.1, interaction_weights=None, rebase_after_days=30):
+        self.decay_rate = decay_rate
+        self.interaction_weights = interaction_weights or {'view': 1, 'click': 3, 'purchase': 10}
+        self.rebase_after_days = rebase_after_days
+        self.reference_day = None
+        self.scores = {}
+        self.event_categories = {}
+        self.heaps = {ALL_CATEGORIES: []}
+        self._lock = threading.Lock()
+
+    def register_events(self, events_df):
+        """Record each event's category so it can be ranked within it"""
+        with self._lock:
+            self.event_categories.update(zip(events_df['event_id'], events_df['category']))
+
+    def is_known(self, event_id):
+        return not self.event_categories or event_id in self.event_categories
+
+    def ingest(self, event_id, interaction_type, timestamp=None):
+        """
+        Add a single interaction to the event's decayed score. Returns False
+        (and changes nothing) for unknown events and interaction types.
+        """
+        weight = self.interaction_weights.get(interaction_type, 0)
+        if not weight or not self.is_known(event_id):
+            return False
+
+        day = float(_to_days(timestamp if timestamp is not None else datetime.now()))
+        with self._lock:
+            self._advance_reference(day)
+            score = self.scores.get(event_id, 0.0) + weight * np.exp(self.decay_rate * (day - self.reference_day))
+            self.scores[event_id] = score
+            self._push(event_id, score)
+
+        return True
+
+    def ingest_frame(self, interactions_df):
+        """Add a batch of interactions, e.g. the historical log at startup"""
+        if interactions_df.empty:
+            return
+
+        days = _to_days(interactions_df['timestamp'].to_numpy())
+        # Look weights up per type code, which also works on dictionary-encoded columns
+        type_codes, interaction_types = pd.factorize(interactions_df['interaction_type'])
+        type_weights = np.array([self.interaction_weights.get(t, 0) for t in interaction_types] + [0], dtype=np.float64)
+        weights = type_weights[type_codes]
+        codes, event_ids = pd.factorize(interactions_df['event_id'])
+
+        with self._lock:
+            self._advance_reference(float(days.max()))
+            contributions = weights * np.exp(self.decay_rate * (days - self.reference_day))
+            totals = np.bincount(codes, weights=contributions, minlength=len(event_ids))
+
+            for event_id, total in zip(event_ids, totals):
+                if not total or not self.is_known(event_id):
+                    continue
+                score = self.scores.get(event_id, 0.0) + total
+                self.scores[event_id] = score
+                self._push(event_id, score)
+
+    def top(self, limit=10, category=None, now=None):
+        """Top trending (event_id, score) pairs, optionally within a category"""
+        day = float(_to_days(now if now is not None else datetime.now()))
+
+        with self._lock:
+            heap = self.heaps.get(category)
+            if not heap:
+                return []
+
+            # Pop until we have `limit` live entries, dropping superseded ones
+            # and repeats of an entry that was pushed again with the same score
+            live = []
+            emitted = set()
+            while heap and len(live) < limit:
+                entry = heapq.heappop(heap)
+                if entry[1] not in emitted and self.scores.get(entry[1]) == -entry[0]:
+                    live.append(entry)
+                    emitted.add(entry[1])
+            for entry in live:
+                heapq.heappush(heap, entry)
+
+            decay = np.exp(-self.decay_rate * (day - self.reference_day))
+            return [(event_id, float(-neg_score * decay)) for neg_score, event_id in live]
+
+    def _push(self, event_id, score):
+        """Push the updated score into the global and category heaps"""
+        category = self.event_categories.get(event_id)
+        targets = [ALL_CATEGORIES] if category is None else [ALL_CATEGORIES, category]
+
+        for key in targets:
+            heap = self.heaps.setdefault(key, [])
+            heapq.heappush(heap, (-score, event_id))
+
+            # Stale entries accumulate on every update; compact when they dominate
+            if len(heap) > 2 * len(self.scores) + 64:
+                self.heaps[key] = self._live_entries(key)
+
+    def _live_entries(self, key):
+        entries = [
+            (-score, event_id) for event_id, score in self.scores.items()
+            if key is ALL_CATEGORIES or self.event_categories.get(event_id) == key
+        ]
+        heapq.heapify(entries)
+        return entries
+
+    def _advance_reference(self, day):
+        """Move the reference time forward so stored scores stay in float range"""
+        if self.reference_day is None:
+            self.reference_day = day
+            return
+
+        if day - self.reference_day <= self.rebase_after_days:
+            return
+
+        # Scaling every score by the same positive factor keeps each heap valid
+        factor = np.exp(-self.decay_rate * (day - self.reference_day))
+        self.scores = {event_id: score * factor for event_id, score in self.scores.items()}
+        for key, heap in self.heaps.items():
+            self.heaps[key] = [(neg_score * factor, event_id) for neg_score, event_id in heap]
+        self.reference_day = day
@@ -0,0 +1,63 @@
+# ml-service/serialization.py
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+def add_display_columns(events_df):
+    """
+    Precompute per-event display fields once, at catalog load time: image
+    URL, tag, and the day offset used for the display date.
+    """
+    number = events_df['event_id'].str.split('_').str[1].astype(int)
+
+    return events_df.assign(
+        image='https://images.unsplash.com/photo-' + (1550000000 + number).astype(str),
+        date_offset=(number % 30).astype(np.int8),
+        tag=events_df['category'].str.lower()
+    )
+
+@lru_cache(maxsize=2)
+def _date_labels(today):
+    """Display dates for each of the 30 possible offsets from today"""
+    return np.array([(today + timedelta(days=i)).strftime('%B %d, %Y') for i in range(30)], dtype=object)
+
+def events_to_records(frame, score_column=None, score_key=None):
+    """Convert an events frame to the frontend-friendly list, column by column"""
+    if 'image' not in frame.columns:
+        frame = add_display_columns(frame)
+
+    columns = {
+        'id': frame['event_id'].tolist(),
+        'title': frame['title'].tolist(),
+        'category': frame['category'].tolist(),
+        'location': frame['location'].tolist(),
+        'price': frame['price'].to_numpy(dtype=np.float64).round(2).tolist(),
+        'image': frame['image'].tolist(),
+        'date': _date_labels(date.today())[frame['date_offset'].to_numpy()].tolist(),
+        'tags': [[tag] for tag in frame['tag'].tolist()]
+    }
+    if score_key:
+        if score_column in frame.columns:
+            columns[score_key] = frame[score_column].to_numpy(dtype=np.float64).tolist()
+        else:
+            columns[score_key] = [None] * len(frame)
+
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+def encode_json(payload):
+    """Encode a payload as JSON bytes, with orjson when available; numpy scalars and arrays are allowed"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=lambda value: value.tolist()).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Flask JSON response using the fast encoder"""
+    return Response(encode_json(payload), status=status, mimetype='application/json')
@@ -0,0 +1,31 @@
+import os
+import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the service modules the way app.py does, from the ml-service directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_data(n_users=40, n_events=30, n_interactions=600, seed=0):
+    rng = np.random.RandomState(seed)
+    events = pd.DataFrame({
+        'event_id': [f'event_{i}' for i in range(1, n_events + 1)],
+        'title': [f'Event Title {i}' for i in range(1, n_events + 1)],
+        'category': rng.choice(['Music', 'Sports', 'Arts'], n_events),
+        'location': rng.choice(['New York', 'Chicago'], n_events),
+        'price': rng.randint(20, 200, n_events).astype(np.float32)
+    })
+    interactions = pd.DataFrame({
+        'user_id': rng.choice([f'user_{i}' for i in range(1, n_users + 1)], n_interactions),
+        'event_id': rng.choice(events['event_id'], n_interactions),
+        'interaction_type': rng.choice(['view', 'click', 'purchase'], n_interactions),
+        'timestamp': datetime.now() - pd.to_timedelta(rng.randint(1, 30, n_interactions), unit='D')
+    })
+    return events, interactions
+
+@pytest.fixture
+def sample_data():
+    """A small (events, interactions) pair shaped like app.load_sample_data()"""
+    return make_data()
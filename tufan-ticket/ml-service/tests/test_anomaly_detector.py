@@ -0,0 +1,16 @@
+import numpy as np
+
+from models.anomaly.detector import AnomalyDetector
+
+def test_results_hold_plain_python_numbers():
+    rng = np.random.RandomState(0)
+    metrics = [{'sales_velocity': float(v), 'page_views': float(p)} for v, p in rng.rand(40, 2)]
+    metrics.append({'sales_velocity': 50.0, 'page_views': 80.0})
+
+    results = AnomalyDetector().detect_batch(metrics)
+
+    flagged = [feature for result in results for feature in result['anomalous_features']]
+    assert flagged
+    for feature in flagged:
+        assert type(feature['value']) is float
+        assert type(feature['z_score']) is float
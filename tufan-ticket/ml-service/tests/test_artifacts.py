@@ -0,0 +1,74 @@
+import glob
+import os
+import threading
+
+import numpy as np
+
+from models.data import artifacts
+from models.data.artifacts import load_array, publish, read_meta, save_arrays, staging_path, write_meta
+
+def write(path, value):
+    tmp_path = staging_path(path)
+    save_arrays(tmp_path, values=np.full(4, value))
+    write_meta(tmp_path, {'value': value})
+    publish(tmp_path, path)
+
+def test_readers_never_see_a_missing_artifact(tmp_path):
+    path = str(tmp_path / 'artifact')
+    write(path, 0)
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                read_meta(path)
+            except FileNotFoundError as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for value in range(1, 200):
+        write(path, value)
+    done.set()
+    reader.join()
+
+    assert not errors
+    assert read_meta(path) == {'value': 199}
+
+def test_threads_publishing_the_same_artifact(tmp_path):
+    path = str(tmp_path / 'artifact')
+    errors = []
+
+    def publish_value(value):
+        try:
+            write(path, value)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=publish_value, args=(value,)) for value in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    value = read_meta(path)['value']
+    assert (load_array(path, 'values') == value).all()
+    assert not glob.glob(f'{path}.tmp-*') and not glob.glob(f'{path}.link-*')
+
+def test_replaces_an_unversioned_directory_and_drops_stale_versions(tmp_path, monkeypatch):
+    path = str(tmp_path / 'artifact')
+    # As written by publish() before artifacts were versioned
+    save_arrays(path, values=np.zeros(4))
+    write_meta(path, {'value': 0})
+
+    write(path, 1)
+    assert os.path.islink(path) and read_meta(path) == {'value': 1}
+
+    monkeypatch.setattr(artifacts, 'STALE_VERSION_SECONDS', -1)
+    write(path, 2)
+    write(path, 3)
+    # The current version and the one it replaced
+    assert len(glob.glob(f'{path}.v-*')) == 2
+    assert read_meta(path) == {'value': 3}
@@ -0,0 +1,21 @@
+from models.sentiment.aspects import AspectExtractor
+
+def score(sentence):
+    return {'sentiment': 'positive' if 'great' in sentence else 'negative'}
+
+def test_aspects_without_keywords_are_skipped():
+    extractor = AspectExtractor({'price': ['price', 'cost'], 'venue': [], 'sound': ['', '  ']})
+
+    assert list(extractor.aspects) == ['price']
+    assert extractor.extract('Great price. The venue was loud.', score) == {'price': {'sentiment': 'positive'}}
+
+def test_empty_lexicon_is_not_replaced_by_the_default():
+    extractor = AspectExtractor({})
+
+    assert extractor.aspects == {}
+    assert extractor.extract('Great price and a great venue.', score) == {}
+
+def test_default_lexicon_when_none_given():
+    extractor = AspectExtractor()
+
+    assert 'venue' in extractor.extract('The venue was great.', score)
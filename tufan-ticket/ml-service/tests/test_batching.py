@@ -0,0 +1,32 @@
+import threading
+
+from models.sentiment.batching import MicroBatcher
+
+def test_failing_item_does_not_fail_its_batch():
+    def batch_fn(items):
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    items = ['a', 'b', 12345, 'c']
+    # Submitted together, so they land in one batch
+    futures = [batcher.submit(item) for item in items]
+
+    assert futures[0].result(5) == 'A'
+    assert futures[1].result(5) == 'B'
+    assert futures[3].result(5) == 'C'
+    assert isinstance(futures[2].exception(5), AttributeError)
+
+def test_concurrent_callers_get_their_own_results():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=4, max_wait_ms=20)
+    results = {}
+
+    def call(i):
+        results[i] = batcher(i, timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: i * 2 for i in range(10)}
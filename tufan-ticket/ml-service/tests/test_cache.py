@@ -0,0 +1,16 @@
+import pytest
+
+from models.cache import ResultCache, Uncached
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_uncached_results_are_returned_but_not_stored(tmp_path, backend):
+    cache = ResultCache(backend=backend, path=str(tmp_path / 'cache.db'))
+    calls = []
+
+    def compute(items):
+        calls.append(list(items))
+        return [Uncached(item.upper()) if item == 'b' else item.upper() for item in items]
+
+    assert cache.get_or_compute('test', 1, ['a', 'b', 'b'], compute) == ['A', 'B', 'B']
+    assert cache.get_or_compute('test', 1, ['a', 'b'], compute) == ['A', 'B']
+    assert calls == [['a', 'b'], ['b']]
@@ -0,0 +1,26 @@
+import numpy as np
+
+from conftest import make_data
+from models.data.artifacts import SortedIdMapping, id_array
+from models.recommendation.collaborative_filtering import CollaborativeFilteringModel
+
+def test_integer_user_ids(tmp_path):
+    _, interactions = make_data(n_users=40)
+    # Numerically sorted, but not lexicographically ('10' < '2')
+    interactions['user_id'] = interactions['user_id'].str.split('_').str[1].astype(int)
+
+    model = CollaborativeFilteringModel(n_factors=5).fit(interactions)
+    users = interactions['user_id'].unique()
+    assert all(model.user_mapping.get(int(user_id)) is not None for user_id in users)
+    assert model.get_user_recommendations(int(users[0]), interactions, top_n=5)
+
+    model.save(str(tmp_path / 'cf'))
+    loaded = CollaborativeFilteringModel.load(str(tmp_path / 'cf'))
+    assert all(int(user_id) in loaded.user_mapping for user_id in users)
+
+def test_lookups_that_cannot_match_miss():
+    mapping = SortedIdMapping(id_array([1, 2, 10]))
+    assert mapping.get(10) == 2
+    assert mapping.get('10') is None
+    assert mapping.get(None) is None
+    assert SortedIdMapping(id_array(np.array(['a', 'b'], dtype=object))).get('b') == 1
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from models.trends.elasticity import PriceElasticityTable
+
+@pytest.mark.parametrize('price', [149.99, 89.95, 19.99])
+@pytest.mark.parametrize('n_events', [333, 1000])
+def test_equal_prices_have_no_elasticity(price, n_events):
+    events, interactions = make_data(n_events=n_events, n_interactions=5000)
+    events = events.assign(category='Music', price=np.float32(price))
+
+    table = PriceElasticityTable().build(events, interactions)
+    assert table.elasticity(0) == 0.0
+
+    # Purchases recorded later leave it at zero too
+    table.record_purchase('event_1', 3)
+    assert table.elasticity(0) == 0.0
+
+def test_elasticity_matches_a_least_squares_fit(sample_data):
+    events, interactions = sample_data
+    table = PriceElasticityTable().build(events, interactions)
+    table.record_purchase('event_2', 4)
+
+    purchases = pd.Series(table.purchases, index=events['event_id'])
+    for code, category in enumerate(table.categories):
+        members = events['category'] == category
+        x = np.log(events.loc[members, 'price'].astype(np.float64))
+        y = np.log(purchases[events.loc[members, 'event_id']].to_numpy() + 1)
+        assert table.elasticity(code) == pytest.approx(np.polyfit(x, y, 1)[0])
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from models.data.artifacts import SortedIdMapping
+from models.data.interaction_log import InteractionLog
+from models.data.interactions import get_interaction_store
+from models.recommendation.collaborative_filtering import CollaborativeFilteringModel
+
+def test_read_returns_sorted_categories(tmp_path, sample_data):
+    _, interactions = sample_data
+    log = InteractionLog(str(tmp_path / 'log'))
+    log.append(interactions)
+
+    frame = log.read()
+    for key in ('user_id', 'event_id', 'interaction_type'):
+        categories = frame[key].cat.categories
+        assert list(categories) == sorted(categories)
+    # Values survive the recoding
+    assert sorted(frame['user_id'].astype(str)) == sorted(interactions['user_id'])
+
+def test_collaborative_filtering_on_log_backed_data(tmp_path, sample_data):
+    _, interactions = sample_data
+    log = InteractionLog(str(tmp_path / 'log'))
+    log.append(interactions)
+    frame = log.read()
+
+    model = CollaborativeFilteringModel(n_factors=5).fit(frame)
+
+    # Every user in the log resolves through the sorted ID mapping
+    users = interactions['user_id'].unique()
+    assert all(user_id in model.user_mapping for user_id in users)
+
+    # Recommendations come from the factors, so they exclude what the user has seen
+    store = get_interaction_store(frame)
+    for user_id in users[:10]:
+        seen = set(store.user_event_ids(user_id))
+        recommended = model.get_user_recommendations(user_id, frame, top_n=5)
+        assert recommended
+        assert not seen & set(recommended)
+
+def test_sorted_id_mapping_rejects_unsorted_ids():
+    with pytest.raises(ValueError):
+        SortedIdMapping(np.array(['user_2', 'user_1']))
+
+@pytest.mark.parametrize('source', ['frame', 'parquet'])
+def test_rows_with_missing_ids_are_dropped(tmp_path, sample_data, source):
+    _, interactions = sample_data
+    interactions = interactions.astype({'user_id': object, 'event_id': object})
+    interactions.loc[[3, 10], 'user_id'] = None
+    interactions.loc[[5], 'event_id'] = None
+
+    log = InteractionLog(str(tmp_path / 'log'))
+    if source == 'parquet':
+        pytest.importorskip('pyarrow')
+        interactions.to_parquet(tmp_path / 'interactions.parquet')
+        log.append_parquet(str(tmp_path / 'interactions.parquet'))
+    else:
+        log.append(interactions)
+
+    frame = log.read().sort_values('timestamp', kind='stable')
+    expected = interactions.drop([3, 5, 10]).sort_values('timestamp', kind='stable')
+    assert not frame[['user_id', 'event_id']].isna().any().any()
+    for key in ('user_id', 'event_id'):
+        assert (frame[key].astype(object).to_numpy() == expected[key].to_numpy()).all()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from models.recommendation.collaborative_filtering import CollaborativeFilteringModel
+from models.recommendation.content_based import ContentBasedRecommender
+from models.recommendation.hybrid import HybridRecommender
+from models.recommendation.materialized import MaterializedRecommendations
+
+def test_save_over_loaded_store_keeps_it_readable(tmp_path):
+    path = str(tmp_path / 'recs')
+    store = MaterializedRecommendations(top_k=3)
+    store.reserve(['user_1', 'user_2'])
+    store.put('user_1', np.array([4, 2, 7]), np.array([0.9, 0.5, 0.1]))
+    store.put('user_2', np.array([1, 5]), np.array([0.8, 0.3]))
+    store.save(path)
+
+    loaded = MaterializedRecommendations.load(path)
+    # Saving again while the loaded store still maps the files
+    loaded.save(path)
+    reloaded = MaterializedRecommendations.load(path)
+
+    for current in (loaded, reloaded):
+        positions, scores = current.get('user_1', 3)
+        np.testing.assert_array_equal(positions, [4, 2, 7])
+        np.testing.assert_allclose(scores, [0.9, 0.5, 0.1], rtol=1e-6)
+        positions, _ = current.get('user_2', 3)
+        np.testing.assert_array_equal(positions, [1, 5])
+
+def test_refresh_then_read_back(tmp_path, sample_data):
+    path = str(tmp_path / 'recs')
+    events, interactions = sample_data
+    model = HybridRecommender(
+        CollaborativeFilteringModel(n_factors=5).fit(interactions),
+        ContentBasedRecommender().fit(events)
+    )
+    model.materialize(interactions, events, top_k=5, path=path)
+    expected = {
+        user_id: model.get_materialized_recommendations(user_id, events, limit=5)['event_id'].tolist()
+        for user_id in model.materialized.user_rows
+    }
+
+    # Nothing changed, so the refresh recomputes no users but still rewrites the store
+    assert model.refresh_materialized(interactions, events, path=path) == []
+
+    for user_id, event_ids in expected.items():
+        assert model.get_materialized_recommendations(user_id, events, limit=5)['event_id'].tolist() == event_ids
+    # Other workers load the published store
+    reloaded = MaterializedRecommendations.load(path)
+    for user_id, event_ids in expected.items():
+        positions, _ = reloaded.get(user_id, 5)
+        assert events['event_id'].iloc[positions].tolist() == event_ids
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from models.sentiment.analyzer import SentimentAnalyzer
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_forked_child_can_load_while_parent_holds_the_load_lock():
+    analyzer = SentimentAnalyzer()
+    # As if the parent's warmup thread were inside _load_transformer at fork time
+    analyzer._load_lock.acquire()
+    pid = os.fork()
+    if pid == 0:
+        acquired = analyzer._load_lock.acquire(timeout=1) and analyzer._stats_lock.acquire(timeout=1)
+        os._exit(0 if acquired else 1)
+
+    analyzer._load_lock.release()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+class FakeVader:
+    def polarity_scores(self, text):
+        return {'compound': 0.6, 'pos': 0.6, 'neg': 0.0, 'neu': 0.4}
+
+def failing_model(texts, batch_size=None):
+    raise RuntimeError('model unavailable')
+
+def test_transformer_failures_are_reported_as_fallback():
+    analyzer = SentimentAnalyzer()
+    analyzer.model, analyzer.analyzer = failing_model, FakeVader()
+
+    results, tiers = analyzer.analyze_batch(['great show', ''], return_tiers=True)
+    assert tiers == ['fallback', 'vader']
+    assert results[0]['score'] == 0.6
+
+    analyzer.model = lambda texts, batch_size=None: [{'label': 'POSITIVE', 'score': 0.9} for _ in texts]
+    assert analyzer.analyze_batch(['great show'], return_tiers=True)[1] == ['transformer']
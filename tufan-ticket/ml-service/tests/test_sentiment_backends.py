@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip('transformers')
+pytest.importorskip('torch')
+
+from benchmarks.sentiment_backends import REVIEWS
+from models.data.artifacts import has_artifact
+from models.sentiment.analyzer import TRANSFORMER_MODEL, SentimentAnalyzer
+
+# The agreement a backend needs with the float model to be switched on
+MIN_AGREEMENT = 0.95
+
+def load(backend, **kwargs):
+    try:
+        return SentimentAnalyzer(backend=backend, **kwargs).load()
+    except OSError as e:
+        # Offline, with the model not in the local cache
+        pytest.skip(f'{TRANSFORMER_MODEL} is not available: {e}')
+
+@pytest.fixture(scope='module')
+def reference():
+    return load('pytorch').analyze_batch(REVIEWS)
+
+@pytest.mark.parametrize('backend', ['quantized', 'onnx'])
+def test_backend_agrees_with_the_float_model(reference, backend, tmp_path):
+    kwargs = {}
+    if backend == 'onnx':
+        pytest.importorskip('optimum.onnxruntime')
+        kwargs['onnx_path'] = str(tmp_path / 'sentiment-onnx')
+
+    results = load(backend, **kwargs).analyze_batch(REVIEWS)
+    agreement = sum(
+        result['sentiment'] == expected['sentiment'] for result, expected in zip(results, reference)
+    ) / len(REVIEWS)
+    assert agreement >= MIN_AGREEMENT
+
+    if backend == 'onnx':
+        # Exported once; a second analyzer loads the saved model
+        assert has_artifact(kwargs['onnx_path'])
+        assert load('onnx', **kwargs).analyze_batch(REVIEWS[:4]) == results[:4]
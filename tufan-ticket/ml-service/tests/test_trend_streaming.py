@@ -0,0 +1,29 @@
+import pandas as pd
+
+from models.trends.streaming import StreamingTrendEngine
+
+def make_engine():
+    engine = StreamingTrendEngine()
+    engine.register_events(pd.DataFrame({
+        'event_id': ['event_1', 'event_2', 'event_3'],
+        'category': ['Music', 'Music', 'Sports']
+    }))
+    return engine
+
+def test_unknown_events_are_ignored():
+    engine = make_engine()
+    assert engine.ingest('event_1', 'purchase')
+    assert not engine.ingest('event_404', 'purchase')
+
+    assert [event_id for event_id, _ in engine.top(limit=10)] == ['event_1']
+
+def test_unknown_interaction_type_does_not_duplicate_entries():
+    engine = make_engine()
+    engine.ingest('event_1', 'click')
+    engine.ingest('event_2', 'view')
+    assert not engine.ingest('event_1', 'share')
+
+    event_ids = [event_id for event_id, _ in engine.top(limit=10)]
+    assert event_ids == ['event_1', 'event_2']
+    # Repeated calls see the same ranking
+    assert [event_id for event_id, _ in engine.top(limit=10)] == event_ids
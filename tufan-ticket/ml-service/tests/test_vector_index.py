@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+
+from models.data.artifacts import load_array, save_arrays
+from models.recommendation.vector_index import IVFIndex
+
+def test_restored_ivf_maps_list_vectors_instead_of_copying(tmp_path):
+    path = str(tmp_path)
+    vectors = np.random.RandomState(0).rand(200, 8)
+    built = IVFIndex(n_lists=10, n_probe=3).build(vectors)
+    save_arrays(path, vectors=vectors)
+    built.save(path)
+
+    mapped = load_array(path, 'vectors')
+    restored = IVFIndex(n_lists=10, n_probe=3).restore(path, mapped)
+
+    assert isinstance(restored._list_vectors, np.memmap)
+    query = vectors[7]
+    for expected, actual in zip(built.search(query, 5), restored.search(query, 5)):
+        np.testing.assert_allclose(actual, expected)
+
+def test_restored_sparse_ivf_matches_built_index(tmp_path):
+    path = str(tmp_path)
+    vectors = sp.random(150, 30, density=0.2, format='csr', random_state=0)
+    built = IVFIndex(n_lists=8, n_probe=3).build(vectors)
+    built.save(path)
+
+    restored = IVFIndex(n_lists=8, n_probe=3).restore(path, vectors)
+
+    # scipy keeps a read-only view of the mapped file rather than a copy
+    assert not restored._list_vectors.data.flags.writeable
+    query = vectors[3]
+    for expected, actual in zip(built.search(query, 5), restored.search(query, 5, exclude=None)):
+        np.testing.assert_allclose(actual, expected)
+
+def test_restore_without_list_vectors_gathers_probed_rows(tmp_path):
+    path = str(tmp_path)
+    vectors = np.random.RandomState(1).rand(100, 4)
+    built = IVFIndex(n_lists=6, n_probe=2).build(vectors)
+    built.save(path)
+    os.remove(os.path.join(path, 'ivf_list_vectors.npy'))
+
+    restored = IVFIndex(n_lists=6, n_probe=2).restore(path, vectors)
+
+    assert restored._list_vectors is None
+    for expected, actual in zip(built.search(vectors[0], 4, exclude=[0]), restored.search(vectors[0], 4, exclude=[0])):
+        np.testing.assert_allclose(actual, expected)